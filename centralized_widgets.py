@@ -1,57 +1,2238 @@
+import time
+START_TIME = time.perf_counter()  # Zero point for --trace-startup
 import tkinter as tk
 from tkinter import font, messagebox
 import threading
-import time
 import datetime
 import os
 import sys
 import subprocess  # Added for safe nvidia-smi call
+import ctypes
+import atexit
+import heapq
+import queue
+import random
+from collections import namedtuple, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import mmap
+import struct
+import zlib
+import bisect
+import glob
+import base64
+import json
+import socket
+import socketserver
+import signal
+import hashlib
+import email.utils
+import urllib.parse
+import importlib
+import importlib.util
+from array import array
+
+# --- STARTUP TRACE ---
+# Import cost per optional module and build time / time-to-first-paint per widget,
+# all in ms since START_TIME. Imports are always recorded (it's one perf_counter
+# pair each); widgets only with --trace-startup.
+class StartupTrace:
+    def __init__(self, t0):
+        self.t0 = t0
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.marks = OrderedDict()
+        self.imports = OrderedDict()
+        self.widgets = OrderedDict()
+
+    def ms(self, t=None):
+        return round(((t or time.perf_counter()) - self.t0) * 1000, 1)
+
+    def mark(self, name):
+        self.marks[name] = self.ms()
+
+    def record_import(self, name, started, ok):
+        with self.lock:
+            self.imports[name] = {"ms": round((time.perf_counter() - started) * 1000, 1), "at_ms": self.ms(started),
+                                  "thread": threading.current_thread().name, "ok": ok}
+
+    def record_widget(self, name, widget, started):
+        if not self.enabled: return
+        entry = {"build_ms": round((time.perf_counter() - started) * 1000, 1), "first_paint_ms": None}
+        self.widgets[name] = entry
+        def painted(event):
+            if entry["first_paint_ms"] is None: entry["first_paint_ms"] = self.ms()
+        widget.bind("<Expose>", painted, add="+")
+
+    def pending_paints(self):
+        return [name for name, e in self.widgets.items() if e["first_paint_ms"] is None]
+
+    def report(self):
+        with self.lock:
+            imports = OrderedDict(self.imports)
+        return {"marks": self.marks, "imports": imports, "widgets": self.widgets}
+
+STARTUP = StartupTrace(START_TIME)
+
+# --- DEPENDENCY CHECK ---
+# Optional packages are imported on first use, by the widget (usually on a scheduler
+# worker) that needs them, so `requests` & co. never delay the first paint.
+class LazyImport:
+    # `if requests:` imports the module (False if missing); `requests.available`
+    # only checks that it is installed, without importing it
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._loaded = False
+        self._spec = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    started = time.perf_counter()
+                    try: self._module = importlib.import_module(self._name)
+                    except ImportError: self._module = None
+                    STARTUP.record_import(self._name, started, self._module is not None)
+                    self._loaded = True
+        return self._module
+
+    @property
+    def available(self):
+        if self._loaded: return self._module is not None
+        if self._spec is None:
+            try: self._spec = importlib.util.find_spec(self._name) is not None
+            except (ImportError, ValueError): self._spec = False
+        return self._spec
+
+    def __bool__(self):
+        return self._load() is not None
+
+    def __getattr__(self, attr):
+        module = self._load()
+        if module is None:
+            raise AttributeError(f"optional module {self._name!r} is not installed")
+        return getattr(module, attr)
+
+serial = LazyImport("serial")
+requests = LazyImport("requests")
+psutil = LazyImport("psutil")
+webbrowser = LazyImport("webbrowser")
+
+# --- CONFIGURATION & THEME ---
+THEME = {
+    "width": 160,
+    "height": 90,
+    "bg": "#050505",
+    "fg": "#e0e0e0",
+    "alpha": 0.85,
+    "accent_cyan": "#00e5ff",
+    "accent_green": "#00e676",
+    "accent_red": "#ff1744",
+    "accent_yellow": "#f1c40f",
+    "accent_blue": "#2979ff",
+    "font_main": ("Segoe UI", 8),       # Smaller font
+    "font_bold": ("Segoe UI", 8, "bold"),
+    "font_small": ("Segoe UI", 7),
+    "font_icon": ("Segoe UI", 10),
+    "font_mono": ("Consolas", 8)
+}
+
+# Persistent state (history, caches) lives next to the script
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "widget_data")
+
+# Widget lifecycle: hidden widgets stop polling, idle ones (no input / screen locked)
+# poll this many times slower
+LIFECYCLE_SLOWDOWN = {"active": 1, "idle": 5}
+IDLE_AFTER_MS = 5 * 60 * 1000
+
+# Drag/resize: at most one geometry pass per display frame; snap to other widgets' edges
+FRAME_MS = 16
+SNAP_DIST = 10
+LAYOUT_GAP = 10
+LAYOUT_SAVE_DELAY_MS = 1000  # Positions/visibility/opacity are written once changes settle
+
+# Monitor: the sampling pass (psutil + GPU) may use this fraction of one core; the
+# process scan of the expanded view is spaced out to fit, at most every PROC_MIN_S
+MONITOR_CPU_BUDGET = 0.02
+MONITOR_TOP_N = 5
+MONITOR_PROC_MIN_S = 2
+MONITOR_EXPANDED_SIZE = (320, 300)
+
+# Where the collectors (prices, monitor sampling, Arduino link) run: "thread" = in
+# this process on the scheduler's workers, "process" = a child process that only
+# sends updates to the UI (--collector process), "daemon" = a shared --daemon
+COLLECTOR_MODE = os.environ.get("WIDGETS_COLLECTOR", "thread")
+# A crashing collector process is restarted after 1, 2, 4... s (at most 60 s); after
+# this many crashes in a row the collectors move back into the UI process
+COLLECTOR_RESTART_MAX_S = 60
+COLLECTOR_MAX_RESTARTS = 5
+
+# --daemon listens here (Unix socket; localhost TCP where AF_UNIX isn't available).
+# "--collector daemon" frontends connect to it and start it if it isn't running.
+DAEMON_SOCKET = os.environ.get("WIDGETS_DAEMON_SOCKET") or os.path.join(DATA_DIR, "widgets.sock")
+DAEMON_PORT = int(os.environ.get("WIDGETS_DAEMON_PORT", "47813"))
+
+# Notes are saved once typing has paused for this long
+NOTES_SAVE_DELAY_MS = 1500
+NOTES_LOAD_CHUNK = 64 * 1024  # Characters inserted per `after` step while loading
+JOURNAL_COMPACT_BYTES = 1024 * 1024  # Rewrite the notes file once its journal grows past this
+
+# Lexicon: words kept ready for the ">>" button, fetched this many at a time, and the
+# size of the on-disk cache served when offline
+LEXICON_QUEUE_SIZE = 8
+LEXICON_BATCH = 10
+LEXICON_CACHE_MAX = 2000
+# Local dictionary (built with --build-dictionary); when present the network isn't used at all
+LEXICON_DICTIONARY = os.environ.get("WIDGETS_LEXICON_DICT") or os.path.join(DATA_DIR, "lexicon.idx")
+
+# Arduino port, e.g. COM3 or /dev/ttyACM0. Unset = probe every serial port for the board
+ARDUINO_PORT = os.environ.get("WIDGETS_ARDUINO_PORT")
+# Once a board has been found, the other ports are only probed again this often
+# (opening a port resets the board behind it) or when a new one shows up
+ARDUINO_RESWEEP_S = 30
+
+# Arduino: ask the firmware to push a frame this often ("S:<ms>"). DHT11 can't do better than 1 Hz.
+ARDUINO_STREAM_MS = 1000
+
+# HTTP: per-host token bucket (requests/s, burst), backoff after 429/5xx/network errors
+HTTP_RATE_LIMITS = {"api.coingecko.com": (0.2, 5)}
+HTTP_DEFAULT_RATE = (2.0, 10)
+HTTP_BACKOFF_BASE = 2
+HTTP_BACKOFF_MAX = 300
+
+# Override with a local stand-in server when testing (e.g. http://127.0.0.1:8000)
+COINGECKO_API = os.environ.get("WIDGETS_COINGECKO_URL", "https://api.coingecko.com/api/v3")
+
+# --- SCHEDULER ---
+# One timer thread for every periodic job in the app plus a small fixed worker pool
+# (so a slow HTTP call never holds up the serial port). Results are queued and a
+# single Tk `after` tick drains them in batches. Adding widgets adds jobs, not threads.
+# Without Tk (collector process) results are handled right away on the worker.
+class Job:
+    def __init__(self, scheduler, fn, interval, jitter, on_result):
+        self.scheduler = scheduler
+        self.fn = fn
+        self.interval = interval
+        self.jitter = jitter
+        self.on_result = on_result
+        self.gen = 0  # Bumped on reschedule/cancel so stale heap entries are skipped
+        self.running = False
+        self.cancelled = False
+        self.paused = False
+        self.slowdown = 1
+        self.state = "active"
+
+    def cancel(self):
+        self.cancelled = True
+        self.gen += 1
+
+    def trigger(self, delay=0):
+        # Run as soon as possible (after `delay`), then continue on the normal interval
+        if self.cancelled or self.paused: return
+        self.gen += 1
+        self.scheduler.push(self, delay)
+
+    def pause(self):
+        self.paused = True
+        self.gen += 1
+
+    def resume(self, catch_up=True):
+        if not self.paused: return
+        self.paused = False
+        if catch_up: self.trigger()
+        elif self.interval: self.scheduler.push(self, self.next_delay())
+
+    def set_lifecycle(self, state):
+        # hidden -> stop polling, idle -> poll slower, active -> normal.
+        # Coming back from hidden does one catch-up run right away.
+        if state == self.state: return
+        self.state = state
+        if state == "hidden":
+            self.pause()
+        else:
+            self.slowdown = LIFECYCLE_SLOWDOWN[state]
+            self.resume()
+
+    def next_delay(self):
+        return self.interval * self.slowdown * (1 + random.uniform(-self.jitter, self.jitter))
+
+class Scheduler:
+    def __init__(self, workers=4, drain_ms=50, batch=200):
+        self.heap = []
+        self.seq = 0
+        self.cond = threading.Condition()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="widget-job")
+        self.results = queue.SimpleQueue()
+        self.drain_ms = drain_ms
+        self.batch = batch
+        self.root = None
+        threading.Thread(target=self.loop, daemon=True).start()
+
+    def every(self, interval, fn, on_result=None, jitter=0.1, delay=0):
+        job = Job(self, fn, interval, jitter, on_result)
+        self.push(job, delay)
+        return job
+
+    def once(self, fn, on_result=None, delay=0):
+        job = Job(self, fn, None, 0, on_result)
+        self.push(job, delay)
+        return job
+
+    def post(self, callback, *args):
+        # Thread-safe: run callback(*args) on the Tk thread at the next drain
+        if self.root is None:
+            try: callback(*args)
+            except Exception: pass
+            return
+        self.results.put((callback, args))
+
+    def push(self, job, delay):
+        with self.cond:
+            self.seq += 1
+            heapq.heappush(self.heap, (time.monotonic() + delay, self.seq, job, job.gen))
+            self.cond.notify()
+
+    def loop(self):
+        while True:
+            with self.cond:
+                while not self.heap or self.heap[0][0] > time.monotonic():
+                    self.cond.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+                _, _, job, gen = heapq.heappop(self.heap)
+            if gen != job.gen or job.cancelled or job.paused: continue
+            if job.running:
+                # Previous run still busy (slow I/O): try again one interval later
+                if job.interval: self.push(job, job.next_delay())
+                continue
+            job.running = True
+            self.pool.submit(self.run, job, gen)
+
+    def run(self, job, gen):
+        try:
+            result = job.fn()
+            if result is not None and job.on_result:
+                self.post(job.on_result, result)
+        except Exception:
+            pass
+        finally:
+            job.running = False
+            # A trigger() while running already queued the next run
+            if job.interval and not (job.cancelled or job.paused) and gen == job.gen:
+                self.push(job, job.next_delay())
+
+    def attach(self, root):
+        self.root = root
+        root.after(self.drain_ms, self.drain)
+
+    def drain(self):
+        for _ in range(self.batch):
+            try: callback, args = self.results.get_nowait()
+            except queue.Empty: break
+            try: callback(*args)
+            except Exception: pass  # e.g. widget destroyed meanwhile
+        try: self.root.after(self.drain_ms, self.drain)
+        except tk.TclError: pass
+
+_scheduler = None
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler()
+    return _scheduler
+
+# --- RING BUFFER ---
+# Fixed-size array of doubles. With a path it is backed by a memory-mapped file
+# (24 byte header + capacity * 8 bytes) so history survives restarts.
+class RingBuffer:
+    HEADER = struct.Struct("<4sIIId")  # magic, capacity, head, count, last_ts
+    MAGIC = b"RNG1"
+
+    def __init__(self, capacity, path=None):
+        self.capacity = capacity
+        self.path = path
+        self.mm = None
+        self.head, self.count, self._last_ts = 0, 0, 0.0
+        if path:
+            self.open_file(path)
+        else:
+            self.data = array('d', bytes(8 * capacity))
+
+    def open_file(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = self.HEADER.size + 8 * self.capacity
+        with open(path, "a+b") as f:
+            if os.path.getsize(path) != size:
+                f.truncate(0)
+                f.write(bytes(size))
+        self.file = open(path, "r+b")
+        self.mm = mmap.mmap(self.file.fileno(), size)
+        magic, cap, head, count, last_ts = self.HEADER.unpack_from(self.mm, 0)
+        if magic == self.MAGIC and cap == self.capacity and head < cap and count <= cap:
+            self.head, self.count, self._last_ts = head, count, last_ts
+        self.data = memoryview(self.mm)[self.HEADER.size:].cast('d')
+        self.write_header()
+
+    def write_header(self):
+        if self.mm is not None:
+            self.HEADER.pack_into(self.mm, 0, self.MAGIC, self.capacity, self.head, self.count, self._last_ts)
+
+    @property
+    def last_ts(self):
+        return self._last_ts
+
+    @last_ts.setter
+    def last_ts(self, ts):
+        self._last_ts = ts
+        self.write_header()
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.write_header()
+
+    def replace_last(self, value):
+        if not self.count: return self.append(value)
+        self.data[(self.head - 1) % self.capacity] = value
+
+    def extend(self, values):
+        for v in list(values)[-self.capacity:]:
+            self.data[self.head] = v
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+        self.write_header()
+
+    def clear(self):
+        self.head, self.count = 0, 0
+        self.write_header()
+
+    def values(self):
+        # Oldest -> newest
+        if self.count < self.capacity:
+            return self.data[:self.count].tolist()
+        return self.data[self.head:].tolist() + self.data[:self.head].tolist()
+
+# --- PRICE HISTORY ---
+# 24h sparkline per pair at market_chart resolution (5 min buckets). Each tick only
+# updates the newest bucket from the batched price; the full chart is downloaded
+# on cold start or after a gap of more than one bucket.
+class PriceHistory:
+    def __init__(self, coin_id, vs_currency, step=300, capacity=288):
+        self.step = step
+        path = os.path.join(DATA_DIR, "history", f"{coin_id}_{vs_currency}.ring")
+        try:
+            self.buf = RingBuffer(capacity, path)
+        except (OSError, ValueError):
+            self.buf = RingBuffer(capacity)
+
+    def needs_backfill(self, now):
+        return not len(self.buf) or now - self.buf.last_ts >= 2 * self.step
+
+    def backfill(self, chart):
+        # chart: market_chart 'prices' -> [[ms, price], ...]
+        if not chart: return
+        self.buf.clear()
+        self.buf.extend(p for _, p in chart)
+        self.buf.last_ts = chart[-1][0] / 1000
+
+    def add(self, now, price):
+        if len(self.buf) and now - self.buf.last_ts < self.step:
+            self.buf.replace_last(price)
+        else:
+            self.buf.append(price)
+            self.buf.last_ts = now
+
+    def values(self):
+        return self.buf.values()
+
+# --- HTTP ---
+# Shared by the network widgets: one keep-alive session, a response cache on disk
+# (DATA_DIR/http_cache, revalidated with ETag / Last-Modified), and per-host rate
+# limiting. Transient failures (network errors, 429, 5xx) put the host in a jittered
+# exponential backoff and raise HttpBackoff, whose retry_in callers use to reschedule.
+class HttpBackoff(Exception):
+    def __init__(self, host, retry_in):
+        super().__init__(f"{host}: retry in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+    def take(self):
+        # -> 0 if a token was taken, else seconds until one is available
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+class HostState:
+    def __init__(self, rate, burst):
+        self.bucket = TokenBucket(rate, burst)
+        self.failures = 0
+        self.until = 0  # Backing off until (monotonic)
+
+class HttpClient:
+    MAX_WAIT = 1.0  # Longer waits for a token are reported as HttpBackoff instead of slept
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(DATA_DIR, "http_cache")
+        self.session = None
+        self.hosts = {}
+        self.memory = {}  # cache key -> entry, in front of the files
+        self.lock = threading.Lock()
+
+    def get_session(self):
+        with self.lock:
+            if self.session is None:
+                self.session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4)
+                self.session.mount("https://", adapter)
+                self.session.mount("http://", adapter)
+                self.session.headers["Accept"] = "application/json"
+            return self.session
+
+    # Cache: entries are {"url", "params", "time", "etag", "last_modified", "body"}
+    def cache_key(self, url, params=None):
+        return url + "?" + urllib.parse.urlencode(sorted((params or {}).items()))
+
+    def cache_path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def load(self, key):
+        with self.lock:
+            if key in self.memory: return self.memory[key]
+        try:
+            with open(self.cache_path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        with self.lock:
+            self.memory[key] = entry
+        return entry
+
+    def store(self, key, entry):
+        with self.lock:
+            self.memory[key] = entry
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.cache_path(key)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def peek(self, url, params=None, key=None):
+        # Last good response, however old -> (data, age in seconds) or None
+        entry = self.load(key or self.cache_key(url, params))
+        if not entry: return None
+        try: return json.loads(entry["body"]), time.time() - entry["time"]
+        except (KeyError, TypeError, ValueError): return None
+
+    # Rate limiting / backoff
+    def host_state(self, host):
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostState(*HTTP_RATE_LIMITS.get(host, HTTP_DEFAULT_RATE))
+            return self.hosts[host]
+
+    def wait_turn(self, host):
+        state = self.host_state(host)
+        with self.lock:
+            remaining = state.until - time.monotonic()
+            wait = remaining if remaining > 0 else state.bucket.take()
+        if wait > self.MAX_WAIT:
+            raise HttpBackoff(host, wait)
+        if wait > 0:
+            time.sleep(wait)
+            with self.lock: state.bucket.take()
+
+    def failed(self, host, retry_after=None):
+        state = self.host_state(host)
+        with self.lock:
+            state.failures += 1
+            delay = min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** (state.failures - 1))
+            delay *= random.uniform(0.5, 1.5)
+            server = parse_retry_after(retry_after)
+            if server is not None: delay = max(delay, min(server, HTTP_BACKOFF_MAX))
+            state.until = time.monotonic() + delay
+        return HttpBackoff(host, delay)
+
+    def succeeded(self, host):
+        state = self.host_state(host)
+        with self.lock:
+            state.failures = 0
+            state.until = 0
+
+    def get_json(self, url, params=None, ttl=None, key=None, timeout=5):
+        # ttl=None: not cached. Otherwise a cached response younger than ttl is returned
+        # without a request, an older one is revalidated (304 -> reused as is).
+        params = dict(params or {})
+        key = key or self.cache_key(url, params)
+        entry = self.load(key) if ttl is not None else None
+        same = bool(entry) and entry.get("url") == url and entry.get("params") == params
+        if same and time.time() - entry.get("time", 0) < ttl:
+            return json.loads(entry["body"])
+        host = urllib.parse.urlsplit(url).hostname or ""
+        self.wait_turn(host)
+        headers = {}
+        if same and entry.get("etag"): headers["If-None-Match"] = entry["etag"]
+        if same and entry.get("last_modified"): headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            r = self.get_session().get(url, params=params, headers=headers, timeout=timeout)
+        except requests.RequestException:
+            raise self.failed(host)
+        if r.status_code == 429 or r.status_code >= 500:
+            raise self.failed(host, r.headers.get("Retry-After"))
+        self.succeeded(host)
+        if r.status_code == 304 and same:
+            entry = dict(entry, time=time.time())
+            self.store(key, entry)
+            return json.loads(entry["body"])
+        r.raise_for_status()
+        data = r.json()
+        if ttl is not None:
+            self.store(key, {"url": url, "params": params, "time": time.time(), "body": r.text,
+                             "etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")})
+        return data
+
+def parse_retry_after(value):
+    # Seconds or an HTTP date -> seconds, None if absent/unparseable
+    if not value: return None
+    try: return max(0.0, float(value))
+    except ValueError: pass
+    try: return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError): return None
+
+_http = None
+
+def get_http():
+    global _http
+    if _http is None:
+        _http = HttpClient()
+    return _http
+
+# --- SHARED PRICE SERVICE ---
+# One scheduler job for every CryptoWidget: all (coin_id, vs_currency) pairs go out
+# in a single /simple/price call through the shared HttpClient, results are fanned
+# out to the subscribers on the Tk thread. The last response is kept on disk and
+# shown at startup until the first poll comes back.
+class PriceService:
+    PRICES_KEY = "coingecko/simple/price"  # One cache entry whatever the set of pairs
+
+    def __init__(self, base_url=COINGECKO_API, interval=60, http=None):
+        self.base_url = base_url.rstrip("/")
+        self.interval = interval
+        self.http = http or get_http()
+        self.retry_pending = False
+        self.subscribers = {}  # (coin_id, vs_currency) -> [callback(price, change, points)]
+        self.histories = {}  # (coin_id, vs_currency) -> PriceHistory
+        self.states = {}  # callback -> lifecycle state of the subscribing widget
+        self.lock = threading.Lock()
+        self.job = None
+
+    def subscribe(self, coin_id, vs_currency, callback):
+        pair = (coin_id, vs_currency)
+        with self.lock:
+            self.subscribers.setdefault(pair, []).append(callback)
+            self.states[callback] = "active"
+            if pair not in self.histories:
+                self.histories[pair] = PriceHistory(coin_id, vs_currency)
+            points = self.histories[pair].values()
+        # Stale-while-revalidate: draw the persisted graph and the last known price
+        # right away, the poll brings them up to date
+        cached = self.http.peek(None, key=self.PRICES_KEY)
+        try: price, change = cached[0][coin_id][vs_currency], cached[0][coin_id][f"{vs_currency}_24h_change"]
+        except (TypeError, KeyError): price, change = (points[-1] if points else None), None
+        if price is not None:
+            callback(price, change, points)
+        self.start()
+
+    def start(self):
+        if self.job is None:
+            self.job = get_scheduler().every(self.interval, self.poll)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            for cbs in self.subscribers.values():
+                if callback in cbs: cbs.remove(callback)
+            self.states.pop(callback, None)
+        self.update_lifecycle()
+
+    def set_state(self, callback, state):
+        with self.lock:
+            if callback in self.states: self.states[callback] = state
+        self.update_lifecycle()
+
+    def update_lifecycle(self):
+        # Poll at the pace of the most visible subscriber
+        states = set(self.states.values())
+        effective = "active" if "active" in states else "idle" if "idle" in states else "hidden"
+        if self.job: self.job.set_lifecycle(effective)
+
+    def fetch_prices(self, pairs):
+        # Batched: ids=bitcoin,tether&vs_currencies=mxn,usd -> {(coin, vs): (price, change)}
+        ids = sorted({coin for coin, _ in pairs})
+        currencies = sorted({vs for _, vs in pairs})
+        params = {"ids": ",".join(ids), "vs_currencies": ",".join(currencies), "include_24hr_change": "true"}
+        # Fresh for half an interval (a quick restart reuses it), revalidated after that
+        data = self.http.get_json(f"{self.base_url}/simple/price", params, ttl=self.interval / 2, key=self.PRICES_KEY)
+        result = {}
+        for coin, vs in pairs:
+            try:
+                result[(coin, vs)] = (data[coin][vs], data[coin][f"{vs}_24h_change"])
+            except (KeyError, TypeError):
+                pass
+        return result
+
+    def fetch_history(self, coin_id, vs_currency):
+        params = {"vs_currency": vs_currency, "days": 1}
+        return self.http.get_json(f"{self.base_url}/coins/{coin_id}/market_chart", params,
+                                  ttl=self.histories[(coin_id, vs_currency)].step)['prices']
+
+    def poll(self):
+        with self.lock:
+            subs = {pair: list(cbs) for pair, cbs in self.subscribers.items() if cbs}
+        if not subs: return
+        try:
+            prices = self.fetch_prices(list(subs))
+        except HttpBackoff as e:
+            # Retry on the backoff schedule rather than a whole interval later
+            if e.retry_in < self.interval and not self.retry_pending:
+                self.retry_pending = True
+                get_scheduler().once(self.retry, delay=e.retry_in)
+            return
+        now = time.time()
+        for pair, (price, change) in prices.items():
+            hist = self.histories[pair]
+            if hist.needs_backfill(now):
+                try: hist.backfill(self.fetch_history(*pair))
+                except Exception: pass
+            hist.add(now, price)
+            points = hist.values()
+            for cb in subs[pair]:
+                get_scheduler().post(cb, price, change, points)
+
+    def retry(self):
+        self.retry_pending = False
+        if self.job and not self.job.paused: self.poll()
+
+_price_service = None
+
+def get_price_service():
+    global _price_service
+    if _price_service is None:
+        _price_service = PriceService()
+    return _price_service
+
+# --- BINDINGS ---
+# Widgets publish display state into Bindings instead of calling config directly.
+# set() is a no-op when the value equals what was last rendered; real changes are
+# queued and applied in one after_idle pass, with one configure() per Tk widget
+# however many of its options changed.
+class Binding:
+    __slots__ = ("widget", "option", "apply", "value")
+
+    def __init__(self, widget, option=None, apply=None):
+        # option: a config option of widget; or apply(value) for anything else (canvas items)
+        self.widget = widget
+        self.option = option
+        self.apply = apply
+        self.value = None
+
+    def set(self, value):
+        if value == self.value: return False
+        self.value = value
+        RENDER.queue(self)
+        return True
+
+class RenderBatch:
+    def __init__(self):
+        self.pending = OrderedDict()  # Binding -> None (ordered set)
+        self.scheduled = False
+
+    def queue(self, binding):
+        self.pending[binding] = None
+        if not self.scheduled: self.schedule(binding)
+
+    def schedule(self, binding):
+        # On the root: an after_idle on the binding's own widget dies with that widget
+        try:
+            binding.widget._root().after_idle(self.flush)
+            self.scheduled = True
+        except tk.TclError:
+            self.pending.pop(binding, None)
+
+    def flush(self):
+        try:
+            bindings, self.pending = list(self.pending), OrderedDict()
+            options = OrderedDict()
+            for b in bindings:
+                if b.option: options.setdefault(b.widget, {})[b.option] = b.value
+                else:
+                    try: b.apply(b.value)
+                    except tk.TclError: pass
+            for widget, opts in options.items():
+                try: widget.configure(**opts)
+                except tk.TclError: pass  # Destroyed meanwhile
+        finally:
+            self.scheduled = False
+            if self.pending: self.schedule(next(iter(self.pending)))  # Queued during the flush
+
+RENDER = RenderBatch()
+
+# --- SPARKLINE ---
+# Retained-mode line graph: the line and end-dot items are created once and moved
+# with canvas.coords. Series longer than the canvas are reduced to a min/max pair
+# per pixel column, so Tk never handles more than ~2 * width points.
+class Sparkline:
+    def __init__(self, canvas, color="white", width=2, pad=5, smooth=False, dot=True):
+        self.canvas = canvas
+        self.pad = pad
+        self.color = color
+        self.data, self.lo, self.hi = [], None, None
+        self.drawn = None  # Coordinates last sent to Tk, identical redraws are skipped
+        self.line = canvas.create_line(0, 0, 0, 0, fill=color, width=width, smooth=smooth, state="hidden")
+        self.dot = canvas.create_oval(0, 0, 0, 0, fill="white", outline="", state="hidden") if dot else None
+        canvas.bind("<Configure>", lambda e: self.redraw(), add="+")
+
+    @staticmethod
+    def downsample(data, columns):
+        # -> [(index, value), ...] with at most 2 points per column, in series order
+        n = len(data)
+        if n <= 2 * columns:
+            return list(enumerate(data))
+        out = []
+        for i in range(columns):
+            a, b = i * n // columns, (i + 1) * n // columns
+            chunk = data[a:b]
+            lo, hi = min(chunk), max(chunk)
+            i_lo, i_hi = a + chunk.index(lo), a + chunk.index(hi)
+            if i_lo == i_hi: out.append((i_lo, lo))
+            elif i_lo < i_hi: out.extend(((i_lo, lo), (i_hi, hi)))
+            else: out.extend(((i_hi, hi), (i_lo, lo)))
+        return out
+
+    def size(self):
+        w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if w <= 1 or h <= 1:  # Not mapped yet
+            w, h = int(self.canvas.cget("width")), int(self.canvas.cget("height"))
+        return w, h
+
+    def update(self, data, color=None, lo=None, hi=None):
+        self.data, self.lo, self.hi = data, lo, hi
+        if color and color != self.color:
+            self.color = color
+            self.canvas.itemconfig(self.line, fill=color)
+        self.redraw()
+
+    def redraw(self):
+        data = self.data
+        if not data:
+            if self.drawn is not None:
+                self.canvas.itemconfig(self.line, state="hidden")
+                if self.dot: self.canvas.itemconfig(self.dot, state="hidden")
+                self.drawn = None
+            return
+        w, h = self.size()
+        mn = min(data) if self.lo is None else self.lo
+        mx = max(data) if self.hi is None else self.hi
+        rng = mx - mn if mx != mn else 1
+        x_step = w / max(len(data) - 1, 1)
+        y_span = h - 2 * self.pad
+        coords = []
+        for i, val in self.downsample(data, max(w, 1)):
+            coords.append(round(i * x_step, 1))
+            coords.append(round(h - ((val - mn) / rng * y_span) - self.pad, 1))
+        if len(coords) == 2:
+            coords = [0, coords[1], w, coords[1]]
+        if coords == self.drawn: return
+        shown = self.drawn is not None
+        self.drawn = coords
+        self.canvas.coords(self.line, *coords)
+        if not shown: self.canvas.itemconfig(self.line, state="normal")
+        if self.dot:
+            last_x, last_y = coords[-2], coords[-1]
+            self.canvas.coords(self.dot, last_x-2, last_y-2, last_x+2, last_y+2)
+            if not shown: self.canvas.itemconfig(self.dot, state="normal")
+
+# --- GPU SAMPLERS ---
+# Point at a fake binary to test without a GPU
+NVIDIA_SMI = os.environ.get("WIDGETS_NVIDIA_SMI", "nvidia-smi")
+
+class NvmlUtilization(ctypes.Structure):
+    _fields_ = [("gpu", ctypes.c_uint), ("memory", ctypes.c_uint)]
+
+class NvmlGpuSampler:
+    # Direct NVML calls through ctypes, no process at all
+    def __init__(self, index=0):
+        if sys.platform == "win32":
+            names = ["nvml.dll", os.path.join(os.environ.get("ProgramFiles", ""), "NVIDIA Corporation", "NVSMI", "nvml.dll")]
+        else:
+            names = ["libnvidia-ml.so.1", "libnvidia-ml.so"]
+        self.lib = None
+        for name in names:
+            try:
+                self.lib = ctypes.CDLL(name)
+                break
+            except OSError:
+                continue
+        if self.lib is None:
+            raise OSError("NVML library not found")
+        if self.lib.nvmlInit_v2() != 0:
+            raise OSError("nvmlInit failed")
+        self.handle = ctypes.c_void_p()
+        if self.lib.nvmlDeviceGetHandleByIndex_v2(index, ctypes.byref(self.handle)) != 0:
+            self.close()
+            raise OSError(f"No NVML device {index}")
+
+    def sample(self):
+        util = NvmlUtilization()
+        temp = ctypes.c_uint()
+        if self.lib.nvmlDeviceGetUtilizationRates(self.handle, ctypes.byref(util)) != 0:
+            raise OSError("nvmlDeviceGetUtilizationRates failed")
+        self.lib.nvmlDeviceGetTemperature(self.handle, 0, ctypes.byref(temp))  # 0 = NVML_TEMPERATURE_GPU
+        return float(util.gpu), float(temp.value)
+
+    def close(self):
+        try: self.lib.nvmlShutdown()
+        except Exception: pass
+
+class SmiStreamGpuSampler:
+    # One long-lived `nvidia-smi --loop-ms` child, stdout parsed as a stream
+    def __init__(self, binary=None, index=0, interval_ms=1000):
+        cmd = [binary or NVIDIA_SMI, f"--id={index}", "--query-gpu=utilization.gpu,temperature.gpu",
+               "--format=csv,noheader,nounits", f"--loop-ms={interval_ms}"]
+        flags = 0x08000000 if sys.platform == "win32" else 0  # CREATE_NO_WINDOW
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL, text=True, bufsize=1, creationflags=flags)
+        self.latest = None
+        threading.Thread(target=self.read_loop, daemon=True).start()
+
+    def read_loop(self):
+        # Output format: "30, 45" once per loop
+        for line in self.proc.stdout:
+            parts = line.strip().split(',')
+            try:
+                util = float(parts[0].strip())
+                temp = float(parts[1].strip()) if len(parts) > 1 else 0
+            except ValueError:
+                continue  # "[N/A]" or a warning line
+            self.latest = (util, temp)
+
+    def sample(self):
+        if self.proc.poll() is not None:
+            raise OSError(f"nvidia-smi exited ({self.proc.returncode})")
+        return self.latest  # None until the first line arrives
+
+    def close(self):
+        try: self.proc.kill()
+        except Exception: pass
+
+class GpuMonitor:
+    # Tries each backend in order; once none works (or the open one dies) it stays off
+    def __init__(self, backends=(NvmlGpuSampler, SmiStreamGpuSampler)):
+        self.backends = backends
+        self.sampler = None
+        self.disabled = False
+        self.lock = threading.Lock()  # sample() runs on a worker, close() may come from the Tk thread
+        atexit.register(self.close)
+
+    def open(self):
+        for backend in self.backends:
+            try:
+                return backend()
+            except Exception:
+                continue
+        raise OSError("No GPU telemetry backend available")
+
+    def sample(self):
+        # -> (util, temp), or None when there is no data (yet / anymore)
+        with self.lock:
+            if self.disabled: return None
+            try:
+                if self.sampler is None:
+                    self.sampler = self.open()
+                return self.sampler.sample()
+            except Exception:
+                self.disabled = True
+                self.close_sampler()
+                return None
+
+    def close(self):
+        with self.lock:
+            self.close_sampler()
+
+    def close_sampler(self):
+        sampler, self.sampler = self.sampler, None
+        if sampler is not None:
+            try: sampler.close()
+            except Exception: pass
+
+# --- SYSTEM SAMPLER ---
+# Everything the Monitor shows, collected in one pass per tick: per-core CPU (the
+# total is their mean, so it is one psutil call), memory, swap, disk and network
+# rates from counter deltas, GPU, and in the expanded view the top processes. The
+# pass measures its own thread CPU time; the process scan, by far the most
+# expensive part, is spaced out so the total stays within the budget.
+SystemSample = namedtuple("SystemSample", "cpu cores mem swap disk_read disk_write net_recv net_sent gpu procs")
+
+class SystemSampler:
+    def __init__(self, gpu, budget=MONITOR_CPU_BUDGET, top_n=MONITOR_TOP_N):
+        self.gpu = gpu
+        self.budget = budget
+        self.top_n = top_n
+        self.detail = False  # Expanded view: scan processes too
+        self.last = None  # (monotonic, disk counters, net counters)
+        self.base_cost = 0.0  # Smoothed thread CPU seconds per pass, without the process scan
+        self.scan_cost = 0.0
+        self.scan_due = 0
+        self.procs = []  # [(cpu %, name, mem %)] from the last scan
+        self.stats = {"passes": 0, "scans": 0, "cpu_seconds": 0.0}
+
+    @staticmethod
+    def smooth(avg, value):
+        return value if not avg else 0.7 * avg + 0.3 * value
+
+    def sample(self):
+        if not psutil: return None
+        started = time.thread_time()
+        now = time.monotonic()
+        cores = psutil.cpu_percent(percpu=True)
+        cpu = sum(cores) / len(cores) if cores else 0.0
+        mem = psutil.virtual_memory().percent
+        try: swap = psutil.swap_memory().percent
+        except (OSError, RuntimeError): swap = 0.0
+        try: disk = psutil.disk_io_counters()
+        except (OSError, RuntimeError): disk = None
+        try: net = psutil.net_io_counters()
+        except (OSError, RuntimeError): net = None
+        rates = [0.0, 0.0, 0.0, 0.0]
+        dt = now - self.last[0] if self.last else 0
+        if dt > 0:
+            _, disk0, net0 = self.last
+            if disk and disk0:
+                rates[0] = max(0, disk.read_bytes - disk0.read_bytes) / dt
+                rates[1] = max(0, disk.write_bytes - disk0.write_bytes) / dt
+            if net and net0:
+                rates[2] = max(0, net.bytes_recv - net0.bytes_recv) / dt
+                rates[3] = max(0, net.bytes_sent - net0.bytes_sent) / dt
+        self.last = (now, disk, net)
+        gpu = self.gpu.sample()
+        cost = time.thread_time() - started
+        self.base_cost = self.smooth(self.base_cost, cost)
+
+        if self.detail and now >= self.scan_due:
+            t0 = time.thread_time()
+            self.procs = self.scan_processes()
+            scan = time.thread_time() - t0
+            cost += scan
+            self.scan_cost = self.smooth(self.scan_cost, scan)
+            self.stats["scans"] += 1
+            # Whatever the per-tick pass leaves of the budget pays for the scans
+            spare = max(self.budget - self.base_cost / max(dt, 1), self.budget / 4)
+            self.scan_due = now + max(MONITOR_PROC_MIN_S, self.scan_cost / spare)
+        self.stats["passes"] += 1
+        self.stats["cpu_seconds"] += cost
+        return SystemSample(cpu, cores, mem, swap, *rates, gpu, self.procs if self.detail else None)
+
+    def scan_processes(self):
+        # process_iter keeps its Process objects between calls, so cpu_percent is
+        # the usage since the previous scan (0 the first time a process is seen)
+        procs = []
+        for p in psutil.process_iter(["name", "cpu_percent", "memory_percent"]):
+            info = p.info
+            if info.get("cpu_percent") is None: continue
+            procs.append((info["cpu_percent"], info.get("name") or "?", info.get("memory_percent") or 0.0))
+        return heapq.nlargest(self.top_n, procs)
+
+def format_rate(value):
+    # Bytes/s -> "512B" / "34K" / "1.2M" / "3.4G"
+    for unit in ("B", "K", "M"):
+        if value < 1024:
+            return f"{value:.0f}{unit}" if unit != "M" or value >= 10 else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}G"
+
+# --- ARDUINO LINK ---
+Telemetry = namedtuple("Telemetry", "temp hum light_on clock manual")
+
+class FrameParser:
+    # Splits the serial byte stream into lines. "$seq,temp,hum,light,HH:MM,manual*CS"
+    # lines are frames (CS = hex XOR of the bytes between $ and *, seq wraps at 256);
+    # anything else is handed back as a plain line (legacy "D" replies, acks).
+    def __init__(self, max_line=128):
+        self.max_line = max_line
+        self.buf = bytearray()
+        self.last_seq = None
+        self.stats = dict.fromkeys(("frames", "bad_checksum", "malformed", "dropped", "overflow"), 0)
+
+    def feed(self, data):
+        # -> (frames, lines)
+        self.buf += data
+        frames, lines = [], []
+        while True:
+            i = self.buf.find(b"\n")
+            if i < 0:
+                if len(self.buf) > self.max_line:
+                    self.stats["overflow"] += 1
+                    self.buf.clear()
+                break
+            line = bytes(self.buf[:i]).strip()
+            del self.buf[:i + 1]
+            if line.startswith(b"$"):
+                frame = self.parse_frame(line)
+                if frame: frames.append(frame)
+            elif line:
+                lines.append(line.decode("utf-8", "replace"))
+        return frames, lines
+
+    def parse_frame(self, line):
+        body, sep, cs = line[1:].partition(b"*")
+        check = 0
+        for b in body: check ^= b
+        try:
+            valid = sep and int(cs, 16) == check
+        except ValueError:
+            valid = False
+        if not valid:
+            self.stats["bad_checksum"] += 1
+            return None
+        parts = body.decode("ascii", "replace").split(",")
+        try:
+            seq = int(parts[0])
+            frame = Telemetry(float(parts[1]), float(parts[2]), parts[3] == "1", parts[4], parts[5] == "1")
+        except (ValueError, IndexError):
+            self.stats["malformed"] += 1
+            return None
+        if self.last_seq is not None:
+            self.stats["dropped"] += (seq - self.last_seq - 1) % 256
+        self.last_seq = seq
+        self.stats["frames"] += 1
+        return frame
+
+    def parse_legacy(self, line):
+        # Old firmware reply to "D": temp,hum,light,HH:MM[,manual]
+        parts = line.split(',')
+        try:
+            return Telemetry(float(parts[0]), float(parts[1]), parts[2] == '1', parts[3],
+                             len(parts) == 5 and parts[4] == '1')
+        except (ValueError, IndexError):
+            self.stats["malformed"] += 1
+            return None
+
+class TelemetryLog:
+    # Day-rotated binary log, DATA_DIR/telemetry/YYYY-MM-DD.bin (UTC days). Each sample
+    # is 3 float32: seconds since midnight, temp, hum (12 bytes). Queries read the day
+    # files into array('f') and reduce them to min/max/mean buckets with C-level
+    # slicing, so no per-sample Python objects are built. Memory is bounded by the
+    # small write buffer; days older than `retention_days` are deleted.
+    RECORD = struct.Struct("<fff")
+
+    def __init__(self, directory=None, retention_days=31, flush_every=30):
+        self.directory = directory or os.path.join(DATA_DIR, "telemetry")
+        self.retention_days = retention_days
+        self.flush_every = flush_every
+        self.buffer = bytearray()
+        self.buffer_day = None
+        self.last_flush = time.time()
+        self.lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self.prune()
+
+    def day_path(self, day):
+        return os.path.join(self.directory, f"{day.isoformat()}.bin")
+
+    @staticmethod
+    def split_ts(ts):
+        day = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).date()
+        midnight = datetime.datetime(day.year, day.month, day.day, tzinfo=datetime.timezone.utc).timestamp()
+        return day, midnight
+
+    def append(self, ts, temp, hum):
+        with self.lock:
+            day, midnight = self.split_ts(ts)
+            if day != self.buffer_day:
+                self.write_buffer()
+                if self.buffer_day is not None: self.prune()
+                self.buffer_day = day
+            self.buffer += self.RECORD.pack(ts - midnight, temp, hum)
+            if time.time() - self.last_flush >= self.flush_every:
+                self.write_buffer()
+
+    def flush(self):
+        with self.lock:
+            self.write_buffer()
+
+    def write_buffer(self):
+        self.last_flush = time.time()
+        if not self.buffer: return
+        try:
+            with open(self.day_path(self.buffer_day), "ab") as f:
+                f.write(self.buffer)
+            self.buffer.clear()
+        except OSError:
+            pass
+
+    def prune(self):
+        cutoff = (datetime.datetime.now(datetime.timezone.utc).date() - datetime.timedelta(days=self.retention_days)).isoformat()
+        for name in os.listdir(self.directory):
+            if name.endswith(".bin") and name[:-4] < cutoff:
+                try: os.remove(os.path.join(self.directory, name))
+                except OSError: pass
+
+    def query(self, start, end, buckets, field="temp"):
+        # -> [(min, max, mean) or None] * buckets covering [start, end)
+        self.flush()
+        col = 1 if field == "temp" else 2
+        width = (end - start) / buckets
+        acc = [None] * buckets  # [min, max, sum, count]
+        day, _ = self.split_ts(start)
+        last_day, _ = self.split_ts(end)
+        while day <= last_day:
+            data = array('f')
+            try:
+                with open(self.day_path(day), "rb") as f:
+                    raw = f.read()
+                data.frombytes(raw[:len(raw) - len(raw) % self.RECORD.size])
+            except OSError:
+                pass
+            if data:
+                midnight = datetime.datetime(day.year, day.month, day.day, tzinfo=datetime.timezone.utc).timestamp()
+                times, values = data[0::3], data[col::3]
+                first = max(0, int((midnight - start) // width))
+                last = min(buckets - 1, int((midnight + 86400 - start) // width))
+                for b in range(first, last + 1):
+                    lo = bisect.bisect_left(times, start + b * width - midnight)
+                    hi = bisect.bisect_left(times, start + (b + 1) * width - midnight)
+                    if lo >= hi: continue
+                    chunk = values[lo:hi]
+                    mn, mx, total = min(chunk), max(chunk), sum(chunk)
+                    a = acc[b]
+                    if a is None: acc[b] = [mn, mx, total, hi - lo]
+                    else: acc[b] = [min(a[0], mn), max(a[1], mx), a[2] + total, a[3] + hi - lo]
+            day += datetime.timedelta(days=1)
+        return [(a[0], a[1], a[2] / a[3]) if a else None for a in acc]
+
+class LatencyHistogram:
+    # Power-of-two millisecond buckets: <1, <2, <4 ... <2048, >=2048
+    EDGES = [2 ** i for i in range(12)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.EDGES) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def record(self, ms):
+        self.counts[bisect.bisect_right(self.EDGES, ms)] += 1
+        self.total += ms
+        self.n += 1
+
+    def percentile(self, q):
+        # Upper edge of the bucket holding the q-th sample
+        if not self.n: return None
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= q * self.n:
+                return self.EDGES[i] if i < len(self.EDGES) else float("inf")
+
+    def summary(self):
+        if not self.n: return "no samples"
+        lines = [f"n={self.n}  mean={self.total / self.n:.1f}ms  p50<{self.percentile(0.5)}ms  p95<{self.percentile(0.95)}ms"]
+        lo = 0
+        for edge, c in zip(self.EDGES + [None], self.counts):
+            if c: lines.append(f"{lo:>5}-{edge if edge else '':<5}ms {c}")
+            lo = edge
+        return "\n".join(lines)
+
+class CommandQueue:
+    # Single writer queue for the serial port, filled from any thread and drained by
+    # the link's poll job. Pending commands of the same group replace each other
+    # (ON/OFF/AUTO are one "mode" group), one command is in flight at a time and
+    # waits for "ACK:<cmd>" with timeout + retry. Firmware that has never acked
+    # anything gets fire-and-forget writes.
+    GROUPS = {"ON": "mode", "OFF": "mode", "AUTO": "mode"}
+
+    def __init__(self, timeout=1.0, retries=2):
+        self.timeout = timeout
+        self.retries = retries
+        self.pending = OrderedDict()  # group -> command
+        self.inflight = None  # [command, first_sent, last_sent, attempts]
+        self.acks_supported = False
+        self.lock = threading.Lock()
+        self.stats = dict.fromkeys(("queued", "coalesced", "sent", "acked", "retries", "failed"), 0)
+        self.latency = LatencyHistogram()
+
+    @staticmethod
+    def key(cmd):
+        return cmd.split(":")[0]
+
+    def put(self, cmd):
+        group = self.GROUPS.get(self.key(cmd), self.key(cmd))
+        with self.lock:
+            self.stats["queued"] += 1
+            if group in self.pending: self.stats["coalesced"] += 1
+            self.pending[group] = cmd
+
+    def next_write(self, now):
+        # -> (command to write now or None, command that just failed or None)
+        with self.lock:
+            failed = None
+            if self.inflight:
+                cmd, first, last, attempts = self.inflight
+                if now - last < self.timeout:
+                    return None, None
+                if attempts <= self.retries:
+                    self.inflight = [cmd, first, now, attempts + 1]
+                    self.stats["retries"] += 1
+                    return cmd, None
+                self.stats["failed"] += 1
+                self.inflight, failed = None, cmd
+            if not self.pending:
+                return None, failed
+            _, cmd = self.pending.popitem(last=False)
+            self.stats["sent"] += 1
+            if self.acks_supported:
+                self.inflight = [cmd, now, now, 1]
+            return cmd, failed
+
+    def ack(self, text, now):
+        with self.lock:
+            self.acks_supported = True
+            if self.inflight and self.key(text) == self.key(self.inflight[0]):
+                self.latency.record((now - self.inflight[1]) * 1000)
+                self.stats["acked"] += 1
+                self.inflight = None
+
+    def clear(self):
+        with self.lock:
+            self.pending.clear()
+            self.inflight = None
+
+def list_serial_ports():
+    ports = []
+    try:
+        from serial.tools import list_ports
+        ports = [p.device for p in list_ports.comports()]
+    except Exception:
+        pass
+    if sys.platform.startswith("linux"):
+        ports += glob.glob("/dev/ttyACM*") + glob.glob("/dev/ttyUSB*")
+    return sorted(set(ports))
+
+class ArduinoLink:
+    # Owns the serial port and is polled by a fast scheduler job that never blocks:
+    # it only reads what is already buffered. At connect it asks the firmware to push
+    # frames ("S:<ms>"); firmware that doesn't answer with frames gets "D" polling.
+    # Only the newest sample of each read is published.
+    # Without a fixed port every candidate is probed in parallel with a "D" handshake
+    # and the last good port is remembered. Opening a port toggles DTR and resets
+    # whatever board sits behind it, so once a port is known, retries (short
+    # exponential backoff, or immediately on replug) only probe it and newly appeared
+    # ports, with a full sweep every ARDUINO_RESWEEP_S. Until then every retry is a
+    # full sweep, backing off up to ARDUINO_RESWEEP_S.
+    def __init__(self, port=None, baud=9600, on_status=None, on_sample=None, log=None, candidates=list_serial_ports):
+        self.fixed_port = port
+        self.port = port or self.load_last_port()
+        self.candidates = candidates
+        self.baud = baud
+        self.on_status = on_status
+        self.on_sample = on_sample
+        self.log = log  # TelemetryLog, gets every sample (not only the published one)
+        self.on_error = None  # callback(command) when a command was never acknowledged
+        self.wake = None  # Set by the owner to run poll() right away after send()
+        self.commands = CommandQueue()
+        self.conn = None
+        self.running = True
+        self.parser = FrameParser()
+        self.mode = None  # None (negotiating) | "stream" | "poll"
+        self.wait_until = 0  # Retry delay after a failed open
+        self.negotiate_until = 0
+        self.last_time_sent = 0
+        self.last_request = 0
+        self.backoff = 0.25
+        self.known_ports = None  # Port list at the last open (None: never opened)
+        self.new_ports = set()  # Appeared since then
+        self.swept_at = 0  # Last probe of every candidate
+        self.ports_checked = 0
+
+    def state_path(self):
+        return os.path.join(DATA_DIR, "arduino.json")
+
+    def load_last_port(self):
+        try:
+            with open(self.state_path(), encoding="utf-8") as f:
+                return json.load(f).get("port")
+        except (OSError, ValueError):
+            return None
+
+    def save_last_port(self, port):
+        try:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            with open(self.state_path(), "w", encoding="utf-8") as f:
+                json.dump({"port": port}, f)
+        except OSError:
+            pass
+
+    def probe(self, port, stop, timeout=2.5):
+        # Open and ping with "D" until the board answers (it resets on open, so this
+        # also replaces a fixed boot delay). -> open Serial or None
+        try:
+            conn = serial.Serial(port, self.baud, timeout=0, write_timeout=1)
+        except Exception:
+            return None
+        parser = FrameParser()
+        deadline, next_ping = time.time() + timeout, 0
+        try:
+            while time.time() < deadline and not stop.is_set():
+                if time.time() >= next_ping:
+                    conn.write(b"D\n")
+                    next_ping = time.time() + 0.25
+                data = conn.read(conn.in_waiting or 1)
+                if data:
+                    frames, lines = parser.feed(data)
+                    if frames or any(parser.parse_legacy(l) for l in lines):
+                        return conn
+                else:
+                    time.sleep(0.02)
+        except Exception:
+            pass
+        try: conn.close()
+        except Exception: pass
+        return None
+
+    def discover(self, ports):
+        # -> (conn, port) of the first port that answers, probing all in parallel
+        if not ports: return None, None
+        stop = threading.Event()
+        found = (None, None)
+        with ThreadPoolExecutor(max_workers=len(ports), thread_name_prefix="port-probe") as ex:
+            futures = {ex.submit(self.probe, p, stop): p for p in ports}
+            for fut in as_completed(futures):
+                conn = fut.result()
+                if conn is None: continue
+                if found[0] is None:
+                    found = (conn, futures[fut])
+                    stop.set()
+                else:
+                    conn.close()
+        return found
+
+    def ports_changed(self):
+        # Cheap replug detection while waiting out the backoff
+        if self.known_ports is None or time.time() - self.ports_checked < 0.5: return False
+        self.ports_checked = time.time()
+        ports = set(self.candidate_ports())
+        added = ports - self.known_ports
+        self.known_ports = ports  # A port that vanishes and comes back counts as new
+        self.new_ports |= added
+        return bool(added)
+
+    def candidate_ports(self):
+        if self.fixed_port: return [self.fixed_port]
+        ports = list(self.candidates())
+        if self.port in ports:  # Remembered port first
+            ports.remove(self.port)
+            ports.insert(0, self.port)
+        return ports
+
+    def emit(self, callback, *args):
+        if callback: get_scheduler().post(callback, *args)
+
+    def open(self):
+        ports = self.candidate_ports()
+        if self.fixed_port or self.port is None or time.time() - self.swept_at >= ARDUINO_RESWEEP_S:
+            targets = ports
+            self.swept_at = time.time()
+        else:
+            fresh = self.new_ports | (set(ports) - (self.known_ports or set()))
+            targets = [p for p in ports if p == self.port or p in fresh]
+        self.known_ports, self.new_ports = set(ports), set()
+        conn, port = self.discover(targets)
+        if conn is None:
+            self.emit(self.on_status, False)
+            self.wait_until = time.time() + self.backoff
+            self.backoff = min(self.backoff * 2, 4 if self.port or self.fixed_port else ARDUINO_RESWEEP_S)
+            return
+        self.conn, self.port, self.backoff = conn, port, 0.25
+        if not self.fixed_port: self.save_last_port(port)
+        self.parser = FrameParser()
+        self.commands.clear()
+        self.mode = None
+        self.negotiate_until = 0
+        self.last_time_sent = 0
+        self.wait_until = 0  # The handshake already proved the board is up
+        self.emit(self.on_status, True)
+
+    def close(self):
+        if self.conn:
+            try: self.conn.close()
+            except Exception: pass
+            self.conn = None
+
+    def stop(self):
+        self.running = False
+        self.close()
+
+    def send(self, cmd):
+        # Safe from any thread (Tk click handlers): only queues, poll() does the write
+        self.commands.put(cmd)
+        if self.wake: self.wake()
+
+    def stats_text(self):
+        parser = ", ".join(f"{k}={v}" for k, v in self.parser.stats.items())
+        cmds = ", ".join(f"{k}={v}" for k, v in self.commands.stats.items())
+        return (f"Port {self.port} ({self.mode or 'connecting'})\n\nFrames: {parser}\n\n"
+                f"Commands: {cmds}\n\nRound trip:\n{self.commands.latency.summary()}")
+
+    def poll(self):
+        if not self.running or not serial:
+            return
+        if time.time() < self.wait_until and not (self.conn is None and self.ports_changed()):
+            return
+        if not self.conn:
+            self.open()
+            return
+        try:
+            now = time.time()
+            if now - self.last_time_sent > 15:
+                t = datetime.datetime.now()
+                self.commands.put(f"H:{t.hour}:{t.minute}")
+                self.last_time_sent = now
+            if self.mode is None and not self.negotiate_until:
+                self.commands.put(f"S:{ARDUINO_STREAM_MS}")
+                self.negotiate_until = now + 3
+            elif self.mode is None and now > self.negotiate_until:
+                self.mode = "poll"  # Old firmware, no frames
+            if self.mode == "poll" and now - self.last_request >= 1:
+                self.conn.write(b"D\n")
+                self.last_request = now
+            self.read_available()
+            cmd, failed = self.commands.next_write(time.time())
+            if cmd: self.conn.write(f"{cmd}\n".encode())
+            if failed: self.emit(self.on_error, failed)
+        except Exception:
+            self.close()
+            self.emit(self.on_status, False)
+
+    def read_available(self):
+        waiting = self.conn.in_waiting
+        if not waiting: return
+        frames, lines = self.parser.feed(self.conn.read(waiting))
+        now = time.time()
+        for line in [l for l in lines if l.startswith("ACK:")]:
+            self.commands.ack(line[4:], now)
+            lines.remove(line)
+        if frames or self.mode == "stream":
+            self.mode = "stream"
+            self.parser.stats["malformed"] += len(lines)
+        elif self.mode == "poll":
+            frames = [f for f in map(self.parser.parse_legacy, lines) if f]
+        if frames:
+            if self.log:
+                for f in frames:
+                    if f.temp or f.hum: self.log.append(now, f.temp, f.hum)  # 0,0 = sensor read failed
+            self.emit(self.on_sample, frames[-1])
+
+# --- COLLECTORS ---
+# The data behind the Crypto, Monitor and Arduino widgets as topics on a small bus:
+#   price:<coin>:<vs>  {"price", "change", "points"} | {"offline": True}
+#   monitor            SystemSample fields + "gpu_off"; command {"detail": bool}
+#   arduino            {"status": bool} | {"sample": Telemetry fields} | {"error": cmd}
+#                      | {"stats": text} | {"history": [view, buckets]};
+#                      command "ON"/"OFF"/"AUTO"/"?stats"/{"history": [view, start, end, buckets]}
+# Payloads are plain JSON-able values, so the same DataHub can feed widgets in this
+# process, through a pipe from a child process or over a socket. A source starts
+# with its first subscriber, stops with the last one and polls at the pace of its
+# most visible subscriber.
+REPLY_KEYS = ("stats", "error", "history")  # One-off replies, not kept as the topic's state
+
+def is_reply(payload):
+    return any(key in payload for key in REPLY_KEYS)
+
+class PriceSource:
+    def __init__(self, hub, topic, coin_id, vs_currency):
+        self.hub, self.topic = hub, topic
+        self.pair = (coin_id, vs_currency)
+        self.service = None
+
+    def start(self):
+        # Checked where the requests run, which may not be the UI's process
+        if not requests.available:
+            self.hub.publish(self.topic, {"offline": True})
+            return
+        self.service = get_price_service()
+        self.service.subscribe(*self.pair, self.on_price)
+
+    def on_price(self, price, change, points):
+        self.hub.publish(self.topic, {"price": price, "change": change, "points": list(points)})
+
+    def set_state(self, state):
+        if self.service: self.service.set_state(self.on_price, state)
+
+    def command(self, value):
+        pass
+
+    def stop(self):
+        if self.service: self.service.unsubscribe(self.on_price)
+
+class MonitorSource:
+    def __init__(self, hub, topic):
+        self.hub, self.topic = hub, topic
+        self.gpu = GpuMonitor()
+        self.sampler = SystemSampler(self.gpu)
+        self.job = None
+
+    def start(self):
+        self.job = get_scheduler().every(1, self.sampler.sample, on_result=self.on_sample)
+
+    def on_sample(self, sample):
+        payload = sample._asdict()
+        payload["gpu_off"] = self.gpu.disabled
+        self.hub.publish(self.topic, payload)
+
+    def set_state(self, state):
+        self.job.set_lifecycle(state)
+        # Stop the nvidia-smi child too, it is reopened on the next sample
+        if state == "hidden": self.gpu.close()
+
+    def command(self, value):
+        if isinstance(value, dict) and "detail" in value:
+            self.sampler.detail = bool(value["detail"])
+
+    def stop(self):
+        self.job.cancel()
+        self.gpu.close()
+
+class ArduinoSource:
+    def __init__(self, hub, topic):
+        self.hub, self.topic = hub, topic
+        try: self.log = TelemetryLog()
+        except OSError: self.log = None
+        publish = lambda key: lambda value: hub.publish(topic, {key: value})
+        self.link = ArduinoLink(ARDUINO_PORT, 9600, on_status=publish("status"),
+                                on_sample=lambda t: hub.publish(topic, {"sample": t._asdict()}), log=self.log)
+        self.link.on_error = publish("error")
+        self.job = None
+
+    def start(self):
+        # Short interval: each run only reads what the device already pushed
+        self.job = get_scheduler().every(0.1, self.link.poll)
+        self.link.wake = self.job.trigger
+
+    def set_state(self, state):
+        self.job.set_lifecycle(state)
+
+    def command(self, value):
+        if value == "?stats": self.hub.publish(self.topic, {"stats": self.link.stats_text()})
+        elif value in ("ON", "OFF", "AUTO"): self.link.send(value)
+        elif isinstance(value, dict) and "history" in value:
+            # Chart query: only this log holds the samples not yet written out
+            view, start, end, buckets = value["history"]
+            get_scheduler().once(lambda: [view, self.log.query(start, end, int(buckets)) if self.log else []],
+                                 on_result=lambda r: self.hub.publish(self.topic, {"history": r}))
+
+    def stop(self):
+        self.job.cancel()
+        self.link.stop()
+        if self.log: self.log.flush()
+
+class DataHub:
+    # Owns the sources; handle() takes (op, topic, value) requests from any number of
+    # clients, publish() hands updates to deliver(topic, payload) (any thread)
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self.sources = {}  # topic -> source
+        self.clients = {}  # topic -> {client: lifecycle state}
+        self.last = {}  # topic -> latest payload (the snapshot)
+        self.lock = threading.RLock()
+
+    def make_source(self, topic):
+        kind, _, arg = topic.partition(":")
+        if kind == "price" and arg.count(":") == 1:
+            return PriceSource(self, topic, *arg.split(":"))
+        if topic == "monitor": return MonitorSource(self, topic)
+        if topic == "arduino": return ArduinoSource(self, topic)
+        raise ValueError(f"unknown topic {topic!r}")
+
+    def publish(self, topic, payload):
+        if not is_reply(payload):
+            self.last[topic] = payload
+        self.deliver(topic, payload)
+
+    def handle(self, op, topic, value=None, client=None):
+        with self.lock:
+            if op == "subscribe":
+                if topic not in self.sources:
+                    source = self.make_source(topic)
+                    source.start()
+                    self.sources[topic] = source
+                self.clients.setdefault(topic, {})[client] = "active"
+            elif op == "unsubscribe":
+                self.clients.get(topic, {}).pop(client, None)
+                if not self.clients.get(topic) and topic in self.sources:
+                    self.clients.pop(topic, None)
+                    self.last.pop(topic, None)
+                    self.sources.pop(topic).stop()
+                return
+            elif op == "state":
+                if value not in ("active", "idle", "hidden"):
+                    raise ValueError(f"unknown state {value!r}")
+                if client not in self.clients.get(topic, {}): return  # Not subscribed: nothing to drive
+                self.clients[topic][client] = value
+            elif op == "command":
+                if topic in self.sources: self.sources[topic].command(value)
+                return
+            else:
+                raise ValueError(f"unknown request {op!r}")
+            states = set(self.clients[topic].values())
+            effective = "active" if "active" in states else "idle" if "idle" in states else "hidden"
+            self.sources[topic].set_state(effective)
+
+    def drop_client(self, client):
+        with self.lock:
+            for topic in [t for t, c in self.clients.items() if client in c]:
+                self.handle("unsubscribe", topic, client=client)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.last)
+
+    def close(self):
+        with self.lock:
+            for source in self.sources.values():
+                try: source.stop()
+                except Exception: pass
+            self.sources.clear()
+            self.clients.clear()
+
+class LocalTransport:
+    # Collectors in this process, on the scheduler's workers (the default)
+    def attach(self, dispatch, reconnect):
+        def deliver(topic, payload):
+            # Most sources already report on the Tk thread (scheduler results)
+            if threading.current_thread() is threading.main_thread(): dispatch(topic, payload)
+            else: get_scheduler().post(dispatch, topic, payload)
+        self.hub = DataHub(deliver)
+
+    def request(self, op, topic, value=None):
+        self.hub.handle(op, topic, value)
+
+    def close(self):
+        self.hub.close()
+
+def collector_main(conn):
+    # Child process of ProcessTransport: a DataHub whose updates go up the pipe.
+    # Exits when the UI process goes away (EOF on the pipe).
+    send_lock = threading.Lock()
+    def deliver(topic, payload):
+        with send_lock:
+            try: conn.send((topic, payload))
+            except (OSError, ValueError): pass
+    hub = DataHub(deliver)
+    while True:
+        try: op, topic, value = conn.recv()
+        except (EOFError, OSError): break
+        try: hub.handle(op, topic, value)
+        except Exception: pass
+    hub.close()
+
+class ProcessTransport:
+    # Collectors in a child process: HTTP, JSON decoding, psutil and serial parsing
+    # never hold the GIL of the Tk process, which only unpickles small payloads on
+    # its `after` tick and renders. A dead child is restarted with a backoff and
+    # resubscribed; one that keeps dying is replaced by a LocalTransport.
+    def __init__(self, poll_ms=50, batch=200):
+        self.poll_ms = poll_ms
+        self.batch = batch
+        self.conn = None
+        self.proc = None
+        self.restarts = 0  # Crashes in a row
+        self.started = 0
+        self.restart_at = None
+        self.local = None
+        self.closed = False
+
+    def attach(self, dispatch, reconnect):
+        self.dispatch = dispatch
+        self.reconnect = reconnect
+        self.start()
+        self.root = get_scheduler().root
+        self.root.after(self.poll_ms, self.poll)
+
+    def start(self):
+        import multiprocessing
+        ctx = multiprocessing.get_context("spawn")  # No fork of a threaded Tk process
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=collector_main, args=(child,), name="widget-collector", daemon=True)
+        self.proc.start()
+        child.close()
+        self.started = time.monotonic()
+
+    def request(self, op, topic, value=None):
+        if self.local:
+            self.local.request(op, topic, value)
+            return
+        if self.conn is None: return  # Restarting: the resubscribe sends it again
+        try: self.conn.send((op, topic, value))
+        except (OSError, ValueError): pass  # Restarted on the next poll
+
+    def poll(self):
+        if self.local or self.closed: return
+        if self.conn is None:
+            if time.monotonic() >= self.restart_at:
+                self.start()
+                self.reconnect()
+        else:
+            try:
+                for _ in range(self.batch):
+                    if not self.conn.poll(): break
+                    topic, payload = self.conn.recv()
+                    try: self.dispatch(topic, payload)
+                    except Exception: pass
+            except (EOFError, OSError):
+                self.restart()
+        try: self.root.after(self.poll_ms, self.poll)
+        except tk.TclError: pass
+
+    def restart(self):
+        try: self.conn.close()
+        except OSError: pass
+        self.conn = None
+        if self.proc.is_alive(): self.proc.terminate()
+        if time.monotonic() - self.started > COLLECTOR_RESTART_MAX_S: self.restarts = 0  # Had been healthy
+        self.restarts += 1
+        if self.restarts > COLLECTOR_MAX_RESTARTS:
+            self.local = LocalTransport()
+            self.local.attach(self.dispatch, self.reconnect)
+            self.reconnect()
+            return
+        self.restart_at = time.monotonic() + min(2 ** (self.restarts - 1), COLLECTOR_RESTART_MAX_S)
+
+    def close(self):
+        # EOF on the pipe makes collector_main stop its sources (the telemetry log is
+        # flushed) and return; wait for it before multiprocessing's atexit kills it
+        self.closed = True
+        if self.local: self.local.close()
+        if self.conn is not None:
+            try: self.conn.close()
+            except OSError: pass
+            self.conn = None
+        if self.proc is not None:
+            self.proc.join(timeout=5)
+            if self.proc.is_alive(): self.proc.terminate()
+
+class Feed:
+    # Tk-side end of the bus: widgets subscribe callback(payload) per topic and report
+    # their lifecycle; the transport decides where the collectors run
+    def __init__(self, transport):
+        self.transport = transport
+        self.callbacks = {}  # topic -> [callback]
+        self.states = {}  # topic -> {callback: lifecycle}
+        self.last = {}  # topic -> latest payload, handed to later subscribers
+        self.settings = {}  # topic -> last setting command, sent again after a reconnect
+        transport.attach(self.dispatch, self.resubscribe)
+
+    def subscribe(self, topic, callback):
+        cbs = self.callbacks.setdefault(topic, [])
+        cbs.append(callback)
+        self.states.setdefault(topic, {})[callback] = "active"
+        if len(cbs) == 1:
+            self.transport.request("subscribe", topic)
+        else:
+            self.update_state(topic)
+            if topic in self.last: callback(self.last[topic])
+
+    def unsubscribe(self, topic, callback):
+        cbs = self.callbacks.get(topic, [])
+        if callback in cbs: cbs.remove(callback)
+        self.states.get(topic, {}).pop(callback, None)
+        if cbs: self.update_state(topic)
+        elif topic in self.callbacks:
+            del self.callbacks[topic]
+            self.last.pop(topic, None)
+            self.settings.pop(topic, None)
+            self.transport.request("unsubscribe", topic)
+
+    def set_state(self, topic, callback, state):
+        if callback in self.states.get(topic, {}):
+            self.states[topic][callback] = state
+            self.update_state(topic)
+
+    def update_state(self, topic):
+        states = set(self.states[topic].values())
+        effective = "active" if "active" in states else "idle" if "idle" in states else "hidden"
+        self.transport.request("state", topic, effective)
+
+    def command(self, topic, value, setting=False):
+        # setting=True: a mode rather than an action, so a restarted collector gets it too
+        if setting: self.settings[topic] = value
+        self.transport.request("command", topic, value)
+
+    def resubscribe(self):
+        for topic in self.callbacks:
+            self.transport.request("subscribe", topic)
+            self.update_state(topic)
+            if topic in self.settings: self.transport.request("command", topic, self.settings[topic])
+
+    def dispatch(self, topic, payload):
+        if not is_reply(payload): self.last[topic] = payload
+        for cb in list(self.callbacks.get(topic, ())):
+            try: cb(payload)
+            except Exception: pass  # e.g. widget destroyed meanwhile
+
+    def close(self):
+        self.transport.close()
+
+_feed = None
+
+def get_feed():
+    global _feed
+    if _feed is None:
+        if COLLECTOR_MODE == "daemon": transport = SocketTransport()
+        elif COLLECTOR_MODE == "process": transport = ProcessTransport()
+        else: transport = LocalTransport()
+        _feed = Feed(transport)
+    return _feed
+
+def close_feed():
+    # On exit, after the widgets unsubscribed: stops the collectors wherever they run
+    global _feed
+    if _feed is not None:
+        _feed.close()
+        _feed = None
+
+# --- DAEMON ---
+# `--daemon`: the DataHub without Tk, shared by any number of local frontends. It is
+# the single owner of the serial port and the only poller of CoinGecko. Protocol:
+# newline-delimited JSON over DAEMON_SOCKET (or 127.0.0.1:DAEMON_PORT).
+#   -> {"op": "subscribe" | "unsubscribe", "topic": t}
+#   -> {"op": "state", "topic": t, "value": "active" | "idle" | "hidden"}
+#   -> {"op": "command", "topic": t, "value": v}
+#   -> {"op": "snapshot"}           <- {"snapshot": {topic: payload}}
+#   <- {"topic": t, "data": payload}  (latest value right after subscribe, then changes)
+#   <- {"error": text}
+def daemon_address():
+    return DAEMON_SOCKET if hasattr(socket, "AF_UNIX") else ("127.0.0.1", DAEMON_PORT)
+
+def daemon_connect(address=None, timeout=2):
+    address = address or daemon_address()
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        sock.settimeout(None)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def encode_message(msg):
+    return (json.dumps(msg, separators=(",", ":")) + "\n").encode("utf-8")
+
+class DaemonClient(socketserver.StreamRequestHandler):
+    # One connected frontend. Updates go through a bounded queue and a writer thread,
+    # so a stalled client is dropped instead of blocking the collectors.
+    def setup(self):
+        super().setup()
+        self.topics = set()
+        self.outbox = queue.Queue(maxsize=1000)
+        threading.Thread(target=self.write_loop, daemon=True, name="widget-daemon-writer").start()
+
+    def push(self, data):
+        try: self.outbox.put_nowait(data)
+        except queue.Full: self.disconnect()
+
+    def disconnect(self):
+        try: self.request.shutdown(socket.SHUT_RDWR)
+        except OSError: pass
+
+    def write_loop(self):
+        while True:
+            data = self.outbox.get()
+            if data is None: return
+            try: self.request.sendall(data)
+            except OSError:
+                self.disconnect()
+                return
+
+    def handle(self):
+        daemon = self.server.owner
+        hub = daemon.hub
+        with daemon.lock: daemon.clients.add(self)
+        try:
+            for line in self.rfile:
+                try:
+                    req = json.loads(line)
+                    op, topic, value = req.get("op"), req.get("topic"), req.get("value")
+                except (ValueError, AttributeError):
+                    self.push(encode_message({"error": "expected one JSON object per line"}))
+                    continue
+                if op == "snapshot":
+                    self.push(encode_message({"snapshot": hub.snapshot()}))
+                    continue
+                if not isinstance(topic, str):
+                    self.push(encode_message({"error": "missing topic"}))
+                    continue
+                try: hub.handle(op, topic, value, client=self)
+                except Exception as e:
+                    # A bad request (or a source failing to start) must not end the connection
+                    self.push(encode_message({"error": str(e) or type(e).__name__}))
+                    continue
+                if op == "subscribe":
+                    self.topics.add(topic)
+                    last = hub.snapshot().get(topic)
+                    if last is not None: self.push(encode_message({"topic": topic, "data": last}))
+                elif op == "unsubscribe":
+                    self.topics.discard(topic)
+        except OSError:
+            pass
+        finally:
+            with daemon.lock: daemon.clients.discard(self)
+            hub.drop_client(self)
+            self.outbox.put(None)
+
+class WidgetDaemon:
+    def __init__(self, address=None):
+        self.address = address or daemon_address()
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.hub = DataHub(self.broadcast)
+        if isinstance(self.address, str):
+            self.clear_stale_socket()
+            os.makedirs(os.path.dirname(os.path.abspath(self.address)), exist_ok=True)
+            self.server = socketserver.ThreadingUnixStreamServer(self.address, DaemonClient, bind_and_activate=False)
+        else:
+            self.server = socketserver.ThreadingTCPServer(self.address, DaemonClient, bind_and_activate=False)
+            self.server.allow_reuse_address = True
+        self.server.daemon_threads = True
+        self.server.owner = self
+        try:
+            self.server.server_bind()
+            self.server.server_activate()
+        except OSError:
+            self.server.server_close()
+            raise
+        if isinstance(self.address, str): os.chmod(self.address, 0o600)
+
+    def clear_stale_socket(self):
+        # A socket file nobody answers on is left over from a crashed daemon
+        try:
+            daemon_connect(self.address, timeout=1).close()
+        except OSError:
+            try: os.unlink(self.address)
+            except OSError: pass
+            return
+        raise OSError(f"a daemon is already listening on {self.address}")
+
+    def broadcast(self, topic, payload):
+        data = encode_message({"topic": topic, "data": payload})
+        with self.lock:
+            clients = [c for c in self.clients if topic in c.topics]
+        for client in clients:
+            client.push(data)
+
+    def serve(self):
+        try: signal.signal(signal.SIGTERM, lambda *a: sys.exit(0))  # Clean up the socket file too
+        except ValueError: pass  # Not the main thread
+        try: self.server.serve_forever()
+        except KeyboardInterrupt: pass
+        finally:
+            self.hub.close()
+            self.server.server_close()
+            if isinstance(self.address, str):
+                try: os.unlink(self.address)
+                except OSError: pass
+
+def spawn_daemon():
+    # Detached, so it outlives the frontend that started it
+    kwargs = {"stdin": subprocess.DEVNULL, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), "--daemon"], **kwargs)
 
-# --- DEPENDENCY CHECK ---
-try:
-    import serial
-except ImportError:
-    serial = None
-
-try:
-    import requests
-except ImportError:
-    requests = None
-
-try:
-    import psutil
-except ImportError:
-    psutil = None
-
-try:
-    import webbrowser
-except ImportError:
-    webbrowser = None
+class SocketTransport:
+    # Frontend side: the widgets are thin subscribers of a --daemon. A reader thread
+    # hands updates to the Tk thread; after a (re)connect every topic is resubscribed.
+    def __init__(self, address=None, spawn=True):
+        self.address = address or daemon_address()
+        self.spawn = spawn
+        self.sock = None
+        self.lock = threading.Lock()
+        self.closed = False
 
-# --- CONFIGURATION & THEME ---
-THEME = {
-    "width": 160,
-    "height": 90,
-    "bg": "#050505",
-    "fg": "#e0e0e0",
-    "alpha": 0.85,
-    "accent_cyan": "#00e5ff",
-    "accent_green": "#00e676",
-    "accent_red": "#ff1744",
-    "accent_yellow": "#f1c40f",
-    "accent_blue": "#2979ff",
-    "font_main": ("Segoe UI", 8),       # Smaller font
-    "font_bold": ("Segoe UI", 8, "bold"),
-    "font_small": ("Segoe UI", 7),
-    "font_icon": ("Segoe UI", 10),
-    "font_mono": ("Consolas", 8)
-}
+    def attach(self, dispatch, reconnect):
+        self.dispatch = dispatch
+        self.reconnect = reconnect
+        threading.Thread(target=self.run, daemon=True, name="widget-daemon-link").start()
+
+    def run(self):
+        backoff, spawned = 0.25, False
+        while not self.closed:
+            try:
+                sock = daemon_connect(self.address)
+            except OSError:
+                if self.spawn and not spawned:
+                    spawned = True
+                    try: spawn_daemon()
+                    except OSError: pass
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 4)
+                continue
+            backoff = 0.25
+            with self.lock: self.sock = sock
+            get_scheduler().post(self.reconnect)
+            try:
+                for line in sock.makefile("r", encoding="utf-8"):
+                    try: msg = json.loads(line)
+                    except ValueError: continue
+                    if "topic" in msg: get_scheduler().post(self.dispatch, msg["topic"], msg["data"])
+            except OSError:
+                pass
+            with self.lock: self.sock = None
+            sock.close()
+
+    def request(self, op, topic, value=None):
+        with self.lock: sock = self.sock
+        if sock is None: return  # Sent again by the resubscribe after connecting
+        try: sock.sendall(encode_message({"op": op, "topic": topic, "value": value}))
+        except OSError: pass
+
+    def close(self):
+        self.closed = True
+        with self.lock: sock = self.sock
+        if sock is not None:
+            try: sock.shutdown(socket.SHUT_RDWR)
+            except OSError: pass
+
+def watch_daemon(topics):
+    # --watch: print the snapshot (no topics) or stream the given topics as JSON lines
+    sock = daemon_connect()
+    if not topics:
+        sock.sendall(encode_message({"op": "snapshot"}))
+    for topic in topics:
+        sock.sendall(encode_message({"op": "subscribe", "topic": topic}))
+    try:
+        for line in sock.makefile("r", encoding="utf-8"):
+            sys.stdout.write(line)
+            sys.stdout.flush()
+            if not topics: break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+# --- DRAG & RESIZE ---
+class FrameThrottle:
+    # Coalesces a burst of requests (1000 Hz mouse motion) into one apply() per
+    # frame with the latest value. `after` is Tk's after (or a fake in the benchmark).
+    def __init__(self, after, apply, frame_ms=FRAME_MS):
+        self.after = after
+        self.apply = apply
+        self.frame_ms = frame_ms
+        self.pending = None
+        self.scheduled = False
+
+    def request(self, value):
+        self.pending = value
+        if not self.scheduled:
+            self.scheduled = True
+            self.after(self.frame_ms, self.flush)
+
+    def flush(self):
+        self.scheduled = False
+        value, self.pending = self.pending, None
+        if value is not None: self.apply(value)
+
+def snap_offset(pos, size, others, dist=SNAP_DIST, gap=LAYOUT_GAP):
+    # Smallest correction (within `dist`) that lines an edge up with another widget's
+    # edge, or puts it one layout gap away from it. `others`: [(pos, size), ...] on one axis.
+    best = 0
+    for o_pos, o_size in others:
+        for target in (o_pos, o_pos + o_size - size, o_pos + o_size + gap, o_pos - size - gap):
+            d = target - pos
+            if abs(d) <= dist and (not best or abs(d) < abs(best)): best = d
+    return best
+
+class DragSession:
+    # One drag gesture. `group`: [(widget, x, y, w, h)] moved together (first = the
+    # grabbed one); `others`: [(x, y, w, h)] of the remaining widgets to snap against.
+    def __init__(self, group, others, x_root, y_root, snap=True):
+        self.group = group
+        self.others = others
+        self.start = (x_root, y_root)
+        self.snap = snap
+
+    def move(self, x_root, y_root):
+        # -> [(widget, x, y)] for every widget in the group
+        dx, dy = x_root - self.start[0], y_root - self.start[1]
+        _, x, y, w, h = self.group[0]
+        if self.snap and self.others:
+            dx += snap_offset(x + dx, w, [(ox, ow) for ox, oy, ow, oh in self.others])
+            dy += snap_offset(y + dy, h, [(oy, oh) for ox, oy, ow, oh in self.others])
+        return [(widget, gx + dx, gy + dy) for widget, gx, gy, gw, gh in self.group]
+
+def apply_positions(moves):
+    # Single batched geometry pass for the whole group
+    for widget, x, y in moves:
+        try: widget.geometry(f"+{int(x)}+{int(y)}")
+        except tk.TclError: pass
+
+def bench_drag(events=5000, rate_hz=1000, widgets=9, frame_ms=FRAME_MS):
+    # Synthetic event replay: a column of widgets dragged with a high polling rate mouse.
+    # Compares geometry calls of the old per-event handler with the throttled one.
+    class FakeWidget:
+        calls = 0
+        def geometry(self, spec): FakeWidget.calls += 1
+
+    timers = []
+    now = [0.0]
+    after = lambda ms, fn: timers.append((now[0] + ms / 1000, fn))
+    column = [(FakeWidget(), 80, 500 - i * 100, 160, 90) for i in range(4)]
+    others = [(250, 500 - i * 100, 160, 90) for i in range(widgets - 4)]
+    session = DragSession(column, others, 100, 100)
+    throttle = FrameThrottle(after, apply_positions, frame_ms)
+    t0 = time.perf_counter()
+    for i in range(events):
+        now[0] = i / rate_hz
+        for due, fn in [t for t in timers if t[0] <= now[0]]:
+            timers.remove((due, fn))
+            fn()
+        throttle.request(session.move(100 + i * 0.3, 100 + (i % 200) * 0.2))
+    for _, fn in timers: fn()
+    elapsed = time.perf_counter() - t0
+    return {"events": events, "rate_hz": rate_hz, "group_size": len(column),
+            "geometry_calls_unthrottled": events * len(column), "geometry_calls": FakeWidget.calls,
+            "us_per_event": round(elapsed / events * 1e6, 2)}
 
 # --- BASE WIDGET CLASS ---
 class DesktopWidget(tk.Toplevel):
+    user_idle = False  # Shared: set by CentralApp.poll_idle
+    instances = []  # Live widgets, for group drag and snapping
+    persist_size = False  # Restore the saved width/height too (user-resizable widgets)
+
     def __init__(self, master, x_offset=0, y_offset=0, name="Widget"):
         super().__init__(master)
+        DesktopWidget.instances.append(self)
         self.name = name
+        self.lifecycle = "active"  # active | hidden | idle
         self.config_window(x_offset, y_offset)
         self.setup_ui()
         self.setup_drag()
@@ -69,21 +2250,70 @@ class DesktopWidget(tk.Toplevel):
     def setup_ui(self):
         pass
 
+    # Lifecycle: subclasses react in on_state_change (feed subscriptions, timers)
+    def set_state(self, state):
+        if state == self.lifecycle: return
+        self.lifecycle = state
+        self.on_state_change(state)
+
+    def on_state_change(self, state):
+        pass
+
+    def withdraw(self):
+        super().withdraw()
+        self.set_state("hidden")
+
+    def deiconify(self):
+        super().deiconify()
+        self.set_state("idle" if DesktopWidget.user_idle else "active")
+
+    def destroy(self):
+        if self in DesktopWidget.instances: DesktopWidget.instances.remove(self)
+        self.on_destroy()
+        super().destroy()
+
+    def on_destroy(self):
+        pass
+
     def setup_drag(self):
-        self._drag_data = {"x": 0, "y": 0}
+        self.drag_session = None
+        self.drag_throttle = FrameThrottle(self.after, apply_positions)
         self.bind("<Button-1>", self.on_drag_start)
         self.bind("<B1-Motion>", self.on_drag_motion)
-        
+        self.bind("<ButtonRelease-1>", self.on_drag_end)
+
+    def geometry_rect(self):
+        return self.winfo_x(), self.winfo_y(), self.winfo_width(), self.winfo_height()
+
     def on_drag_start(self, event):
-        self._drag_data["x"] = event.x
-        self._drag_data["y"] = event.y
+        # Shift+drag moves the whole column (every visible widget with the same x)
+        me = self.geometry_rect()
+        group, others = [(self,) + me], []
+        for w in DesktopWidget.instances:
+            if w is self: continue
+            try:
+                if not w.winfo_viewable(): continue
+                rect = w.geometry_rect()
+            except tk.TclError: continue
+            if event.state & 0x1 and abs(rect[0] - me[0]) <= 5:
+                group.append((w,) + rect)
+            else:
+                others.append(rect)
+        self.drag_session = DragSession(group, others, event.x_root, event.y_root)
 
     def on_drag_motion(self, event):
-        delta_x = event.x - self._drag_data["x"]
-        delta_y = event.y - self._drag_data["y"]
-        new_x = self.winfo_x() + delta_x
-        new_y = self.winfo_y() + delta_y
-        self.geometry(f"+{new_x}+{new_y}")
+        if self.drag_session is None: return
+        self.drag_throttle.request(self.drag_session.move(event.x_root, event.y_root))
+
+    def on_drag_end(self, event=None):
+        if self.drag_session is None: return
+        self.drag_session = None
+        self.notify_layout()
+
+    def notify_layout(self):
+        # CentralApp listens on the root and saves the layout
+        try: self.master.event_generate("<<LayoutChanged>>")
+        except tk.TclError: pass
 
     def setup_context_menu(self):
         self.ctx_menu = tk.Menu(self, tearoff=0, bg=THEME['bg'], fg=THEME['fg'])
@@ -94,14 +2324,13 @@ class DesktopWidget(tk.Toplevel):
 
 # --- WIDGET 1: ARDUINO CONTROLLER ---
 class ArduinoWidget(DesktopWidget):
-    def __init__(self, master, x, y):
+    def __init__(self, master, x, y, feed=None):
         super().__init__(master, x, y, "Arduino")
-        self.serial_port = 'COM3'
-        self.baud = 9600
-        self.conn = None
-        self.running = True
-        
-        threading.Thread(target=self.loop_comms, daemon=True).start()
+        self.chart_view = None  # None (live values) | "24h" | "7d"
+        self.chart_at = 0
+        self.stats_requested = False
+        self.feed = feed or get_feed()
+        self.feed.subscribe("arduino", self.on_link)
 
     def setup_ui(self):
         # No Header - Compact Layout
@@ -114,6 +2343,15 @@ class ArduinoWidget(DesktopWidget):
         
         self.lbl_hum = tk.Label(self.info_frame, text="--%", font=("Segoe UI", 12), fg="#888", bg=THEME['bg'])
         self.lbl_hum.pack(side="left", padx=8, pady=(8,0))
+
+        # Temperature history, shown over the values; click the temp to cycle now -> 24h -> 7d
+        self.lbl_temp.config(cursor="hand2")
+        self.lbl_temp.bind("<Button-1>", self.cycle_chart)
+        self.chart = tk.Canvas(self, width=THEME['width'] - 20, height=40, bg=THEME['bg'], highlightthickness=0, cursor="hand2")
+        self.chart.bind("<Button-1>", self.cycle_chart)
+        self.chart_band = self.chart.create_polygon(0, 0, 0, 0, fill="#1c2733", outline="")
+        self.chart_line = Sparkline(self.chart, color=THEME['accent_cyan'], width=1, pad=4, dot=False)
+        self.chart_label = self.chart.create_text(2, 2, anchor="nw", text="", fill="#666", font=THEME['font_small'])
         
         # Bottom: Controls
         self.ctrl_frame = tk.Frame(self, bg=THEME['bg'])
@@ -140,45 +2378,77 @@ class ArduinoWidget(DesktopWidget):
         self.send_cmd("AUTO")
 
     def send_cmd(self, cmd):
-        if self.conn and self.conn.is_open:
-            try:
-                self.conn.write(f"{cmd}\n".encode())
-            except:
-                pass
+        self.feed.command("arduino", cmd)
 
-    def loop_comms(self):
-        last_time_sent = 0
-        while self.running:
-            if serial and not self.conn:
-                try:
-                    self.conn = serial.Serial(self.serial_port, self.baud, timeout=0.5)
-                    time.sleep(2)
-                    self.after(0, lambda: self.update_status(True))
-                except:
-                    self.after(0, lambda: self.update_status(False))
-                    time.sleep(5) 
-                    continue
+    def on_state_change(self, state):
+        self.feed.set_state("arduino", self.on_link, state)
 
-            if self.conn and self.conn.is_open:
-                try:
-                    if time.time() - last_time_sent > 15:
-                        now = datetime.datetime.now()
-                        self.conn.write(f"H:{now.hour}:{now.minute}\n".encode())
-                        last_time_sent = time.time()
-                    
-                    self.conn.write(b"D\n")
-                    line = self.conn.readline().decode('utf-8').strip()
-                    if line:
-                        parts = line.split(',')
-                        if len(parts) >= 4:
-                            self.after(0, lambda p=parts: self.update_ui_data(p))
-                except Exception as e:
-                    try: self.conn.close()
-                    except: pass
-                    self.conn = None
-                    self.after(0, lambda: self.update_status(False))
-            
-            time.sleep(1)
+    def on_destroy(self):
+        self.feed.unsubscribe("arduino", self.on_link)
+
+    def on_link(self, update):
+        if "sample" in update: self.update_ui_data(Telemetry(**update["sample"]))
+        elif "status" in update: self.update_status(update["status"])
+        elif "error" in update: self.show_command_error(update["error"])
+        elif "history" in update: self.draw_chart(*update["history"])
+        elif "stats" in update and self.stats_requested:
+            self.stats_requested = False
+            messagebox.showinfo("Arduino link", update["stats"], parent=self)
+
+    def setup_context_menu(self):
+        super().setup_context_menu()
+        self.ctx_menu.insert_command(0, label="Link stats", command=self.show_link_stats)
+
+    def show_link_stats(self):
+        # Answered by the collector with a {"stats": text} update
+        self.stats_requested = True
+        self.feed.command("arduino", "?stats")
+
+    def show_command_error(self, cmd):
+        try: self.lbl_status.config(fg=THEME['accent_red'])
+        except: pass
+
+    def cycle_chart(self, event=None):
+        views = [None, "24h", "7d"]
+        self.chart_view = views[(views.index(self.chart_view) + 1) % len(views)]
+        if self.chart_view is None:
+            self.chart.place_forget()
+            return
+        self.chart.place(x=10, y=8)
+        self.refresh_chart()
+
+    def refresh_chart(self):
+        self.chart_at = time.time()
+        view = self.chart_view
+        span = 86400 if view == "24h" else 7 * 86400
+        end = time.time()
+        buckets = int(self.chart.cget("width")) // 2
+        # The collector owns the log (and its unwritten buffer): it answers with {"history"}
+        self.feed.command("arduino", {"history": [view, end - span, end, buckets]})
+
+    def draw_chart(self, view, buckets):
+        if view != self.chart_view: return
+        filled = [b for b in buckets if b]
+        self.chart.itemconfig(self.chart_label, text=view if not filled else
+                              f"{view}  {min(b[0] for b in filled):.0f}-{max(b[1] for b in filled):.0f}°")
+        if not filled:
+            self.chart_line.update([])
+            self.chart.coords(self.chart_band, 0, 0, 0, 0)
+            return
+        # Gaps (no samples) carry the previous bucket so the line stays continuous
+        series, prev = [], filled[0]
+        for b in buckets:
+            prev = b or prev
+            series.append(prev)
+        lo, hi = min(b[0] for b in series), max(b[1] for b in series)
+        self.chart_line.update([b[2] for b in series], lo=lo, hi=hi)
+        w, h = self.chart_line.size()
+        rng = hi - lo if hi != lo else 1
+        step = w / max(len(series) - 1, 1)
+        y = lambda v: h - ((v - lo) / rng * (h - 8)) - 4
+        top = [c for i, b in enumerate(series) for c in (i * step, y(b[1]))]
+        bottom = [c for i, b in reversed(list(enumerate(series))) for c in (i * step, y(b[0]))]
+        self.chart.coords(self.chart_band, *(top + bottom))
 
     def update_status(self, connected):
         color = THEME['accent_green'] if connected else "#333"
@@ -186,19 +2456,16 @@ class ArduinoWidget(DesktopWidget):
         except: pass
 
     def update_ui_data(self, data):
+        if self.chart_view and time.time() - self.chart_at > 60:
+            self.refresh_chart()
         try:
-            temp = data[0]
-            hum = data[1]
-            is_on = (data[2] == '1')
-            is_manual = (len(data) == 5 and data[4] == '1')
+            self.lbl_temp.config(text=f"{data.temp:.1f}°")
+            self.lbl_hum.config(text=f"{data.hum:.0f}%")
             
-            self.lbl_temp.config(text=f"{temp}°")
-            self.lbl_hum.config(text=f"{hum}%")
-            
-            p_color = THEME['accent_green'] if is_on else THEME['accent_red']
+            p_color = THEME['accent_green'] if data.light_on else THEME['accent_red']
             self.btn_power.config(fg=p_color)
             
-            if is_manual:
+            if data.manual:
                 self.lbl_mode.config(text="MANUAL", fg=THEME['accent_yellow'], cursor="hand2")
             else:
                 self.lbl_mode.config(text="AUTO", fg=THEME['accent_blue'], cursor="arrow")
@@ -206,14 +2473,16 @@ class ArduinoWidget(DesktopWidget):
 
 # --- WIDGET 2: CRYPTO TRACKER ---
 class CryptoWidget(DesktopWidget):
-    def __init__(self, master, x, y, coin_id, vs_currency, symbol_char, title):
+    def __init__(self, master, x, y, coin_id, vs_currency, symbol_char, title, feed=None):
         self.coin_id = coin_id
         self.vs_currency = vs_currency
         self.symbol_char = symbol_char
         self.display_title = title
+        self.topic = f"price:{coin_id}:{vs_currency}"
         super().__init__(master, x, y, f"Crypto-{title}")
         
-        threading.Thread(target=self.loop_price, daemon=True).start()
+        self.feed = feed or get_feed()
+        self.feed.subscribe(self.topic, self.on_price)
 
     def setup_ui(self):
         # Header Removed. Layout:
@@ -228,148 +2497,335 @@ class CryptoWidget(DesktopWidget):
         
         self.lbl_change = tk.Label(self.top_frame, text="--%", font=("Segoe UI", 9), fg="#777", bg=THEME['bg'])
         self.lbl_change.pack(side="left", padx=5, pady=(5,0))
+        self.price_text = Binding(self.lbl_price, "text")
+        self.change_text = Binding(self.lbl_change, "text")
+        self.change_color = Binding(self.lbl_change, "fg")
         
         self.canvas = tk.Canvas(self, width=THEME['width'], height=40, bg=THEME['bg'], highlightthickness=0)
         self.canvas.pack(fill="both", expand=True, padx=0, pady=0)
+        self.sparkline = Sparkline(self.canvas, smooth=True)
 
-    def loop_price(self):
-        while True:
-            try:
-                if requests:
-                    url_price = f"https://api.coingecko.com/api/v3/simple/price?ids={self.coin_id}&vs_currencies={self.vs_currency}&include_24hr_change=true"
-                    r = requests.get(url_price, timeout=5)
-                    data = r.json()
-                    
-                    price = data[self.coin_id][self.vs_currency]
-                    change = data[self.coin_id][f"{self.vs_currency}_24h_change"]
-                    
-                    url_hist = f"https://api.coingecko.com/api/v3/coins/{self.coin_id}/market_chart?vs_currency={self.vs_currency}&days=1"
-                    r2 = requests.get(url_hist, timeout=5)
-                    data2 = r2.json()
-                    points = [x[1] for x in data2['prices']]
-                    
-                    self.after(0, lambda p=price, c=change, pts=points: self.update_ui(p, c, pts))
-                else:
-                    self.after(0, lambda: self.lbl_price.config(text="No Net"))
-            except:
-                pass
-            
-            time.sleep(60)
+    def on_state_change(self, state):
+        self.feed.set_state(self.topic, self.on_price, state)
+
+    def on_destroy(self):
+        self.feed.unsubscribe(self.topic, self.on_price)
+
+    def on_price(self, update):
+        if update.get("offline"):
+            self.price_text.set("No Net")  # requests missing where the collectors run
+            return
+        self.update_ui(update["price"], update["change"], update["points"])
 
     def update_ui(self, price, change, points):
         try:
             if price > 100: p_text = f"{self.symbol_char}{price:,.0f}"
             else: p_text = f"{self.symbol_char}{price:,.2f}"
             
-            self.lbl_price.config(text=p_text)
+            self.price_text.set(p_text)
             
+            if change is None:
+                # Cached history only (startup), trend from the graph itself
+                change = points[-1] - points[0] if points else 0
+            else:
+                trend = "▲" if change >= 0 else "▼"
+                self.change_text.set(f"{trend} {abs(change):.1f}%")
             c_color = THEME['accent_green'] if change >= 0 else THEME['accent_red']
-            trend = "▲" if change >= 0 else "▼"
-            self.lbl_change.config(text=f"{trend} {abs(change):.1f}%", fg=c_color)
+            self.change_color.set(c_color)
             
-            self.draw_graph(points, c_color)
+            self.sparkline.update(points, c_color)
         except: pass
 
-    def draw_graph(self, data, color):
-        self.canvas.delete("all")
-        if not data: return
-        w = self.canvas.winfo_width()
-        h = self.canvas.winfo_height()
-        
-        mn = min(data)
-        mx = max(data)
-        rng = mx - mn if mx != mn else 1
-        
-        coords = []
-        step = w / (len(data)-1)
-        # Fill area below line for "mini graph" look? No, simplified line is cleaner.
-        # Let's do a filled polygon for "modern" look.
-        
-        # Line coords
-        for i, val in enumerate(data):
-            x = i * step
-            y = h - ((val - mn) / rng * (h - 10)) - 5 # Padding
-            coords.extend([x, y])
-            
-        self.canvas.create_line(coords, fill=color, width=2, smooth=True)
-        
-        # Optional: Add glowing dot at end
-        last_x, last_y = coords[-2], coords[-1]
-        self.canvas.create_oval(last_x-2, last_y-2, last_x+2, last_y+2, fill="white", outline="")
-
 
 # --- WIDGET 3: MONITOR ---
+# Compact (160x90): CPU and GPU graphs. Expanded (double-click or context menu):
+# per-core bars, memory/swap, disk and network rates, GPU and the top processes.
+# Every series is kept in a RingBuffer whichever view is shown.
 class MonitorWidget(DesktopWidget):
-    def __init__(self, master, x, y):
+    def __init__(self, master, x, y, feed=None):
+        capacity = MONITOR_EXPANDED_SIZE[0]
+        self.hist = {key: RingBuffer(capacity) for key in ("cpu", "gpu", "mem", "swap", "disk", "net")}
+        self.is_expanded = False
+        self.expanded = None  # Built on first expand
+        self.last_sample = None
+        self.gpu_off = False
         super().__init__(master, x, y, "Monitor")
-        threading.Thread(target=self.loop_stats, daemon=True).start()
+        self.bind("<Double-Button-1>", self.toggle_expanded)
+        # Sampled by the "monitor" collector (SystemSampler), once a second
+        self.feed = feed or get_feed()
+        self.feed.subscribe("monitor", self.on_sample)
 
     def setup_ui(self):
-        # No Header -> Just bars
-        # CPU
-        f_cpu = tk.Frame(self, bg=THEME['bg'])
-        f_cpu.pack(fill="x", padx=10, pady=(15, 5))
-        lbl_c = tk.Label(f_cpu, text="CPU", font=THEME['font_bold'], fg=THEME['accent_blue'], bg=THEME['bg'])
-        lbl_c.pack(side="left")
-        self.l_cpu_val = tk.Label(f_cpu, text="--%", font=THEME['font_small'], fg="white", bg=THEME['bg'])
-        self.l_cpu_val.pack(side="right")
-        self.bar_cpu = tk.Canvas(self, height=4, bg="#222", highlightthickness=0)
-        self.bar_cpu.pack(fill="x", padx=10)
-
-        # GPU
-        f_gpu = tk.Frame(self, bg=THEME['bg'])
-        f_gpu.pack(fill="x", padx=10, pady=(10,5))
-        lbl_g = tk.Label(f_gpu, text="GPU", font=THEME['font_bold'], fg=THEME['accent_green'], bg=THEME['bg'])
-        lbl_g.pack(side="left")
-        self.l_gpu_val = tk.Label(f_gpu, text="--%", font=THEME['font_small'], fg="white", bg=THEME['bg'])
-        self.l_gpu_val.pack(side="right")
-        self.bar_gpu = tk.Canvas(self, height=4, bg="#222", highlightthickness=0)
-        self.bar_gpu.pack(fill="x", padx=10)
-
-    def get_gpu_safe(self):
-        try:
-            si = subprocess.STARTUPINFO()
-            si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            # Query utilization and temperature
-            cmd = ["nvidia-smi", "--query-gpu=utilization.gpu,temperature.gpu", "--format=csv,noheader,nounits"]
-            output = subprocess.check_output(cmd, startupinfo=si, creationflags=0x08000000, timeout=1)
-            # Output format: "30, 45"
-            parts = output.decode('utf-8').strip().split(',')
-            util = float(parts[0].strip())
-            temp = float(parts[1].strip()) if len(parts) > 1 else 0
-            return util, temp
-        except: return 0, 0
-
-    def loop_stats(self):
-        while True:
-            if psutil:
-                c_load = psutil.cpu_percent()
-                g_load, g_temp = self.get_gpu_safe()
-                self.after(0, lambda c=c_load, g=g_load, t=g_temp: self.update_ui(c, g, t))
-            time.sleep(1)
-
-    def draw_bar(self, canvas, val, color):
-        canvas.delete("all")
-        w = canvas.winfo_width()
-        h = canvas.winfo_height()
-        fill_w = (val / 100) * w
-        canvas.create_rectangle(0,0, fill_w, h, fill=color, width=0)
-
-    def update_ui(self, cpu, gpu_util, gpu_temp):
-        try:
-            self.l_cpu_val.config(text=f"{cpu:.1f}%")
-            self.draw_bar(self.bar_cpu, cpu, THEME['accent_blue'])
-            
-            # Show GPU Util and Temp
-            self.l_gpu_val.config(text=f"{gpu_util:.1f}% | {gpu_temp:.0f}°C")
-            self.draw_bar(self.bar_gpu, gpu_util, THEME['accent_green'])
-        except: pass
+        # No Header -> Label row + history graph with the current value as a bar underneath
+        self.compact = tk.Frame(self, bg=THEME['bg'])
+        self.compact.pack(fill="both", expand=True)
+        self.cpu_text, self.bar_cpu = self.make_row(self.compact, "CPU", THEME['accent_blue'])
+        self.gpu_text, self.bar_gpu = self.make_row(self.compact, "GPU", THEME['accent_green'])
+
+    def make_row(self, parent, title, color):
+        # -> (Binding for the value label, graph canvas)
+        f = tk.Frame(parent, bg=THEME['bg'])
+        f.pack(fill="x", padx=10, pady=(6, 2))
+        tk.Label(f, text=title, font=THEME['font_bold'], fg=color, bg=THEME['bg']).pack(side="left")
+        value = tk.Label(f, text="--%", font=THEME['font_small'], fg="white", bg=THEME['bg'])
+        value.pack(side="right")
+        return Binding(value, "text"), self.make_graph(color, parent)
+
+    def make_graph(self, color, parent=None):
+        # 18px: graph in the top 14px (pad keeps it clear of the bar), 3px bar at the bottom
+        canvas = tk.Canvas(parent or self, height=18, bg=THEME['bg'], highlightthickness=0)
+        canvas.pack(fill="x", padx=10)
+        canvas.create_rectangle(0, 15, 0, 18, fill="#222", width=0, tags="track")
+        canvas.bar = canvas.create_rectangle(0, 15, 0, 18, fill=color, width=0)
+        canvas.bar_width = Binding(canvas, apply=lambda x: canvas.coords(canvas.bar, 0, 15, x, 18))
+        canvas.sparkline = Sparkline(canvas, color=color, width=1, pad=4, dot=False)
+        canvas.bind("<Configure>", lambda e: canvas.coords("track", 0, 15, e.width, 18), add="+")
+        return canvas
+
+    def build_expanded(self):
+        self.expanded = tk.Frame(self, bg=THEME['bg'])
+        ex = self.expanded
+        self.x_cpu_text, self.x_cpu = self.make_row(ex, "CPU", THEME['accent_blue'])
+        self.cores = tk.Canvas(ex, height=16, bg=THEME['bg'], highlightthickness=0)
+        self.cores.pack(fill="x", padx=10, pady=(2, 0))
+        self.core_bars = []  # Binding per core, created with the first sample
+        self.x_mem_text, self.x_mem = self.make_row(ex, "MEM", THEME['accent_yellow'])
+        self.x_disk_text, self.x_disk = self.make_row(ex, "DISK", THEME['accent_cyan'])
+        self.x_net_text, self.x_net = self.make_row(ex, "NET", "#ea00d9")
+        self.x_gpu_text, self.x_gpu = self.make_row(ex, "GPU", THEME['accent_green'])
+        lbl_procs = tk.Label(ex, text="", font=THEME['font_mono'], fg="#aaa", bg=THEME['bg'], justify="left", anchor="nw")
+        lbl_procs.pack(fill="both", expand=True, padx=10, pady=(6, 4))
+        self.procs_text = Binding(lbl_procs, "text")
+
+    def setup_context_menu(self):
+        super().setup_context_menu()
+        self.ctx_menu.insert_command(0, label="Expanded view", command=self.toggle_expanded)
+
+    def toggle_expanded(self, event=None):
+        self.is_expanded = not self.is_expanded
+        self.feed.command("monitor", {"detail": self.is_expanded}, setting=True)
+        if self.is_expanded:
+            if self.expanded is None: self.build_expanded()
+            self.compact.pack_forget()
+            self.expanded.pack(fill="both", expand=True)
+            w, h = MONITOR_EXPANDED_SIZE
+        else:
+            self.expanded.pack_forget()
+            self.compact.pack(fill="both", expand=True)
+            w, h = THEME['width'], THEME['height']
+        self.ctx_menu.entryconfig(0, label="Compact view" if self.is_expanded else "Expanded view")
+        self.geometry(f"{w}x{h}")
+        if self.last_sample: self.render(self.last_sample)
+        self.notify_layout()
+
+    def on_state_change(self, state):
+        self.feed.set_state("monitor", self.on_sample, state)
+
+    def on_destroy(self):
+        self.feed.unsubscribe("monitor", self.on_sample)
+
+    def on_sample(self, update):
+        self.gpu_off = update.get("gpu_off", False)
+        self.update_ui(SystemSample(*(update[k] for k in SystemSample._fields)))
+
+    def draw_bar(self, canvas, val, history, hi=100):
+        # hi=None: autoscale (rates), the bar is then relative to the graph's peak
+        values = history.values()
+        top = hi or max(max(values, default=0), 1)
+        canvas.bar_width.set(round(min(val / top, 1) * canvas.winfo_width()))
+        canvas.sparkline.update(values, lo=0, hi=hi)
+
+    def update_ui(self, sample):
+        h = self.hist
+        h["cpu"].append(sample.cpu)
+        h["mem"].append(sample.mem)
+        h["swap"].append(sample.swap)
+        h["disk"].append(sample.disk_read + sample.disk_write)
+        h["net"].append(sample.net_recv + sample.net_sent)
+        if sample.gpu is not None: h["gpu"].append(sample.gpu[0])
+        self.last_sample = sample
+        self.render(sample)
+
+    def gpu_label(self, gpu):
+        if gpu is None: return "n/a" if self.gpu_off else "--%"
+        return f"{gpu[0]:.1f}% | {gpu[1]:.0f}°C"
+
+    def render(self, sample):
+        try:
+            if self.is_expanded: self.render_expanded(sample)
+            else: self.render_compact(sample)
+        except tk.TclError: pass
+
+    def render_compact(self, sample):
+        self.cpu_text.set(f"{sample.cpu:.1f}%  RAM {sample.mem:.0f}%")
+        self.draw_bar(self.bar_cpu, sample.cpu, self.hist["cpu"])
+        # Show GPU Util and Temp
+        self.gpu_text.set(self.gpu_label(sample.gpu))
+        if sample.gpu is not None:
+            self.draw_bar(self.bar_gpu, sample.gpu[0], self.hist["gpu"])
+
+    def render_expanded(self, s):
+        h = self.hist
+        self.x_cpu_text.set(f"{s.cpu:.1f}%  ({len(s.cores)} cores)")
+        self.draw_bar(self.x_cpu, s.cpu, h["cpu"])
+        self.draw_cores(s.cores)
+        self.x_mem_text.set(f"{s.mem:.0f}%  swap {s.swap:.0f}%")
+        self.draw_bar(self.x_mem, s.mem, h["mem"])
+        self.x_disk_text.set(f"R {format_rate(s.disk_read)}/s  W {format_rate(s.disk_write)}/s")
+        self.draw_bar(self.x_disk, s.disk_read + s.disk_write, h["disk"], hi=None)
+        self.x_net_text.set(f"↓ {format_rate(s.net_recv)}/s  ↑ {format_rate(s.net_sent)}/s")
+        self.draw_bar(self.x_net, s.net_recv + s.net_sent, h["net"], hi=None)
+        self.x_gpu_text.set(self.gpu_label(s.gpu))
+        if s.gpu is not None: self.draw_bar(self.x_gpu, s.gpu[0], h["gpu"])
+        if s.procs is not None:
+            self.procs_text.set("\n".join(f"{cpu:5.1f}% {mem:4.1f}% {name[:24]}" for cpu, name, mem in s.procs))
+
+    def draw_cores(self, cores):
+        canvas = self.cores
+        if len(self.core_bars) != len(cores):
+            canvas.delete("core")
+            self.core_bars = []
+            for i in range(len(cores)):
+                item = canvas.create_rectangle(0, 0, 0, 0, fill=THEME['accent_blue'], width=0, tags="core")
+                self.core_bars.append(Binding(canvas, apply=lambda geo, item=item: canvas.coords(item, *geo)))
+        w, hgt = canvas.winfo_width(), int(canvas.cget("height"))
+        step = w / max(len(cores), 1)
+        for i, (binding, pct) in enumerate(zip(self.core_bars, cores)):
+            x0 = round(i * step)
+            binding.set((x0, hgt - round(pct / 100 * hgt), max(x0 + 1, round((i + 1) * step) - 1), hgt))
 
 # --- WIDGET 4: NOTES ---
+def text_diff(old, new):
+    # Single changed span between two strings -> (offset, deleted_chars, inserted_text)
+    n = min(len(old), len(new))
+    p = 0
+    while p + 4096 <= n and old[p:p+4096] == new[p:p+4096]: p += 4096
+    while p < n and old[p] == new[p]: p += 1
+    m = 0
+    limit = n - p
+    while m + 4096 <= limit and old[len(old)-m-4096:len(old)-m] == new[len(new)-m-4096:len(new)-m]: m += 4096
+    while m < limit and old[len(old)-m-1] == new[len(new)-m-1]: m += 1
+    return p, len(old) - m - p, new[p:len(new)-m]
+
+class NoteStore:
+    # Base text file plus an append-only journal of edits (<path>.journal). A save
+    # appends only the changed span; the base file is rewritten atomically (temp
+    # file + os.replace) when the journal outgrows JOURNAL_COMPACT_BYTES or after
+    # a load had to replay it. The journal header holds the crc32 of the base file
+    # it applies to, so a crash between the two steps can't replay edits twice.
+    JOURNAL_HEADER = struct.Struct("<4sI")  # magic, crc32 of the base file
+    RECORD = struct.Struct("<III")  # offset, deleted chars, inserted utf-8 bytes
+    MAGIC = b"NJ01"
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.snapshot = ""  # Text as persisted (base + journal)
+        self.base_crc = 0
+        self.journal_size = 0
+        self.pending = None
+        self.lock = threading.Lock()
+        self.write_lock = threading.RLock()
+
+    def load(self):
+        with self.write_lock:
+            data = b""
+            try:
+                with open(self.path, "rb") as f: data = f.read()
+            except OSError:
+                pass
+            self.base_crc = zlib.crc32(data)
+            # A file written by another editor may not be UTF-8: show it rather than nothing
+            text = data.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+            text, replayed = self.replay(text)
+            self.snapshot = text
+            if not self.journal_size and os.path.exists(self.journal_path):
+                self.reset_journal()  # Stale or foreign: never append under its header
+            if replayed: get_scheduler().once(self.compact)
+            return text
+
+    def replay(self, text):
+        replayed = 0
+        try:
+            with open(self.journal_path, "rb") as f: journal = f.read()
+        except OSError:
+            return text, 0
+        hdr = self.JOURNAL_HEADER
+        self.journal_size = 0
+        if len(journal) < hdr.size or hdr.unpack_from(journal) != (self.MAGIC, self.base_crc):
+            return text, 0  # Stale (already compacted) or foreign journal
+        pos = hdr.size
+        while pos + self.RECORD.size <= len(journal):
+            offset, deleted, n = self.RECORD.unpack_from(journal, pos)
+            pos += self.RECORD.size
+            if pos + n > len(journal): break  # Torn last record
+            text = text[:offset] + journal[pos:pos+n].decode("utf-8") + text[offset+deleted:]
+            pos += n
+            replayed += 1
+        self.journal_size = pos
+        return text, replayed
+
+    def submit(self, text):
+        with self.lock:
+            self.pending = text
+        get_scheduler().once(self.flush)
+
+    def flush(self):
+        with self.write_lock:
+            with self.lock:
+                text, self.pending = self.pending, None
+            if text is None or text == self.snapshot: return
+            offset, deleted, inserted = text_diff(self.snapshot, text)
+            payload = inserted.encode("utf-8")
+            try:
+                # journal_size is 0 until a journal for this base_crc exists: start one
+                with open(self.journal_path, "ab" if self.journal_size else "wb") as f:
+                    if f.tell() == 0:
+                        f.write(self.JOURNAL_HEADER.pack(self.MAGIC, self.base_crc))
+                    f.write(self.RECORD.pack(offset, deleted, len(payload)) + payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self.journal_size = f.tell()
+            except OSError:
+                with self.lock:
+                    if self.pending is None: self.pending = text  # Retry with the next save
+                return
+            self.snapshot = text
+            if self.journal_size > JOURNAL_COMPACT_BYTES:
+                self.compact()
+
+    def compact(self):
+        with self.write_lock:
+            data = self.snapshot.replace("\n", os.linesep).encode("utf-8")
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                self.base_crc = zlib.crc32(data)
+                self.reset_journal()
+            except OSError:
+                pass
+
+    def reset_journal(self):
+        # Empty journal whose header matches the current base file
+        try:
+            with open(self.journal_path, "wb") as f:
+                f.write(self.JOURNAL_HEADER.pack(self.MAGIC, self.base_crc))
+                self.journal_size = f.tell()
+        except OSError:
+            self.journal_size = 0
+
 class NotesWidget(DesktopWidget):
-    def __init__(self, master, x, y):
+    def __init__(self, master, x, y, save_delay=NOTES_SAVE_DELAY_MS):
+        self.save_delay = save_delay
+        self.save_after = None
+        self.loaded = False  # Never save before the whole file is in the widget
         super().__init__(master, x, y, "Notes")
         self.file_path = "notas_widget.txt"
+        self.store = NoteStore(self.file_path)
         self.load_notes()
 
     def setup_ui(self):
@@ -377,20 +2833,47 @@ class NotesWidget(DesktopWidget):
         self.text = tk.Text(self, bg=THEME['bg'], fg=THEME['fg'], font=THEME['font_mono'], 
                            insertbackground="white", relief="flat", highlightthickness=0)
         self.text.pack(fill="both", expand=True, padx=8, pady=8)
-        self.text.bind("<KeyRelease>", self.save_notes)
+        self.text.bind("<<Modified>>", self.on_modified)
 
     def load_notes(self):
-        if os.path.exists(self.file_path):
-            try:
-                with open(self.file_path, "r", encoding="utf-8") as f:
-                    self.text.insert("1.0", f.read())
-            except: pass
+        # File + journal are read on a worker, then inserted in chunks so the
+        # window (and every other widget) shows up at once and fills in progressively
+        self.text.config(state="disabled")
+        get_scheduler().once(self.store.load, on_result=self.insert_chunk)
 
-    def save_notes(self, event):
+    def insert_chunk(self, text, pos=0):
         try:
-            with open(self.file_path, "w", encoding="utf-8") as f:
-                f.write(self.text.get("1.0", "end-1c"))
-        except: pass
+            self.text.config(state="normal")
+            self.text.insert("end-1c", text[pos:pos + NOTES_LOAD_CHUNK])
+        except tk.TclError: return  # Destroyed while loading
+        pos += NOTES_LOAD_CHUNK
+        if pos < len(text):
+            self.text.config(state="disabled")
+            self.after(1, self.insert_chunk, text, pos)
+            return
+        self.text.config(state="normal")
+        self.text.edit_reset()
+        self.text.edit_modified(False)
+        self.loaded = True
+
+    def on_modified(self, event=None):
+        # Text's modified flag marks changes; resetting it fires this event again
+        if not self.loaded or not self.text.edit_modified(): return
+        self.text.edit_modified(False)
+        if self.save_after: self.after_cancel(self.save_after)
+        self.save_after = self.after(self.save_delay, self.save_notes)
+
+    def save_notes(self):
+        self.save_after = None
+        self.store.submit(self.text.get("1.0", "end-1c"))
+
+    def on_destroy(self):
+        # Forced flush on exit, synchronously
+        if not self.loaded: return
+        if self.save_after:
+            self.after_cancel(self.save_after)
+            self.save_notes()
+        self.store.flush()
 
 # --- WIDGET 5: LAUNCHER ---
 class LauncherWidget(DesktopWidget):
@@ -427,8 +2910,248 @@ class LauncherWidget(DesktopWidget):
         if webbrowser: webbrowser.open(url)
 
 # --- WIDGET 6: LEXICON ---
+# Offline dictionary file, read through mmap (nothing is loaded up front):
+#   header  <4sII   magic "LXD1", entry count, reserved
+#   offsets <I * (count + 1)   start of each entry in the data area, plus its end
+#   data    "word\tdefinition" per entry (UTF-8), sorted by the word's bytes, ASCII-lowercased
+# Entry i is offsets[i]..offsets[i+1], so a random pick is O(1) and lookup is a
+# binary search over the offsets, O(log n).
+class IndexedDictionary:
+    MAGIC = b"LXD1"
+    HEADER = struct.Struct("<4sII")
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            self.file.close()
+            raise
+        magic, self.count, _ = self.HEADER.unpack_from(self.mm, 0)
+        self.data_start = self.HEADER.size + 4 * (self.count + 1)
+        if magic != self.MAGIC or self.count == 0 or len(self.mm) < self.data_start:
+            self.close()
+            raise ValueError(f"{path}: not a dictionary file")
+
+    def __len__(self):
+        return self.count
+
+    def offset(self, i):
+        return struct.unpack_from("<I", self.mm, self.HEADER.size + 4 * i)[0] + self.data_start
+
+    def raw(self, i):
+        return self.mm[self.offset(i):self.offset(i + 1)]
+
+    def key(self, i):
+        start, end = self.offset(i), self.offset(i + 1)
+        tab = self.mm.find(b"\t", start, end)
+        return self.mm[start:tab if tab >= 0 else end].lower()
+
+    def entry(self, i):
+        word, _, defn = self.raw(i).decode("utf-8", "replace").partition("\t")
+        return word, defn
+
+    def random_entry(self):
+        return self.entry(random.randrange(self.count))
+
+    def lookup(self, word):
+        key = word.strip().encode("utf-8").lower()
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key: lo = mid + 1
+            else: hi = mid
+        if lo < self.count and self.key(lo) == key:
+            return self.entry(lo)[1]
+        return None
+
+    def close(self):
+        try: self.mm.close()
+        except (AttributeError, ValueError): pass
+        self.file.close()
+
+    @classmethod
+    def build(cls, entries, path):
+        # entries: iterable of (word, definition). First definition of a word wins.
+        seen = {}
+        for word, defn in entries:
+            word = " ".join(str(word).split())
+            defn = " ".join(str(defn).split())
+            key = word.encode("utf-8").lower()
+            if word and defn and key not in seen:
+                seen[key] = (word + "\t" + defn).encode("utf-8")
+        keys = sorted(seen)
+        offsets, pos = array("I"), 0
+        for k in keys:
+            offsets.append(pos)
+            pos += len(seen[k])
+        offsets.append(pos)  # Raises OverflowError past 4 GiB of text
+        if sys.byteorder != "little": offsets.byteswap()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, len(keys), 0))
+            f.write(offsets.tobytes())
+            for k in keys:
+                f.write(seen[k])
+        os.replace(tmp, path)
+        return len(keys)
+
+def read_dictionary_source(path):
+    # JSON object {word: definition} or text lines "word<TAB>definition"
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{path}: expected a JSON object of word -> definition")
+        yield from data.items()
+        return
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            word, sep, defn = line.rstrip("\n").partition("\t")
+            if sep: yield word, defn
+
+# Prefetched (word, definition) pairs. One request fetches a batch of random words
+# (?number=N), their definitions are looked up in parallel and words without one are
+# dropped. Everything fetched also goes to DATA_DIR/lexicon_cache.json, which is
+# served at startup while the first batch loads, and instead when the network is down.
+class WordFeed:
+    WORDS_URL = "https://random-word-api.herokuapp.com/word"
+    DEFINE_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/"
+
+    def __init__(self, path=None, size=LEXICON_QUEUE_SIZE, batch=LEXICON_BATCH, cache_max=LEXICON_CACHE_MAX,
+                 dictionary_path=LEXICON_DICTIONARY, http=None):
+        self.path = path or os.path.join(DATA_DIR, "lexicon_cache.json")
+        self.dictionary_path = dictionary_path
+        self.dictionary = None
+        self.size = size
+        self.batch = batch
+        self.cache_max = cache_max
+        self.ready = deque()
+        self.recent = deque(maxlen=50)  # Not served again from the cache for a while
+        self.waiters = []  # Callbacks that found the queue empty
+        self.cache = None  # word -> definition, loaded by the first refill (worker thread)
+        self.refilling = False
+        self.http = http or get_http()
+        self.lock = threading.Lock()
+
+    def take(self, callback):
+        # callback(word, definition): called right away when a word is ready,
+        # otherwise posted to the Tk thread once the refill brings one
+        dictionary = self.get_dictionary()
+        if dictionary is not None:
+            callback(*dictionary.random_entry())
+            return
+        with self.lock:
+            entry = self.ready.popleft() if self.ready else None
+            if entry is None:
+                if callback not in self.waiters: self.waiters.append(callback)
+            else:
+                self.recent.append(entry[0])
+            low = len(self.ready) <= self.size // 2
+        if low: self.request_refill()
+        if entry is not None: callback(*entry)
+
+    def get_dictionary(self):
+        # Picked up as soon as the file exists; no network from then on
+        if self.dictionary is None and self.dictionary_path and os.path.exists(self.dictionary_path):
+            try: self.dictionary = IndexedDictionary(self.dictionary_path)
+            except (OSError, ValueError, struct.error): self.dictionary_path = None
+        return self.dictionary
+
+    def request_refill(self):
+        with self.lock:
+            if self.refilling: return
+            self.refilling = True
+        get_scheduler().once(self.refill)
+
+    def refill(self):
+        entries = []
+        try:
+            if self.cache is None:
+                self.cache = self.load_cache()
+                if self.waiters: self.serve_waiters(self.from_cache(1))  # Last session's words while the network answers
+            try: entries = self.fetch_batch()
+            except Exception: entries = []
+            if entries:
+                for word, defn in entries: self.cache[word] = defn
+                self.save_cache()
+            else:
+                entries = self.from_cache(self.batch)  # Offline
+        finally:
+            with self.lock:
+                self.refilling = False
+            self.serve_waiters(entries)
+
+    def serve_waiters(self, entries):
+        served = []
+        with self.lock:
+            queued = {word for word, _ in self.ready}
+            for entry in entries:
+                if len(self.ready) >= self.size: break
+                if entry[0] not in queued: self.ready.append(entry)
+            while self.waiters and self.ready:
+                entry = self.ready.popleft()
+                self.recent.append(entry[0])
+                served.append((self.waiters.pop(0), entry))
+        for callback, (word, defn) in served:
+            get_scheduler().post(callback, word, defn)
+
+    def fetch_batch(self):
+        # Nothing here goes through the HTTP cache: the word/definition pairs are kept,
+        # bounded, in lexicon_cache.json
+        words = self.http.get_json(self.WORDS_URL, {"number": self.batch})
+        words = [w for w in words if isinstance(w, str) and w not in self.cache]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            return [(word, defn) for word, defn in pool.map(self.define, words) if defn]
+
+    def define(self, word):
+        try:
+            data = self.http.get_json(self.DEFINE_URL + urllib.parse.quote(word))
+            return word, data[0]['meanings'][0]['definitions'][0]['definition']
+        except Exception:
+            return word, None  # 404 = no definition
+
+    def from_cache(self, n):
+        with self.lock:
+            skip = set(self.recent) | {word for word, _ in self.ready}
+        words = [w for w in self.cache if w not in skip]
+        return [(w, self.cache[w]) for w in random.sample(words, min(n, len(words)))]
+
+    def load_cache(self):
+        cache = OrderedDict()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for word, defn in json.load(f).get("words", []):
+                    cache[word] = defn
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+        return cache
+
+    def save_cache(self):
+        while len(self.cache) > self.cache_max:
+            self.cache.popitem(last=False)  # Oldest first
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"words": list(self.cache.items())}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+_word_feed = None
+
+def get_word_feed():
+    global _word_feed
+    if _word_feed is None:
+        _word_feed = WordFeed()
+    return _word_feed
+
 class LexiconWidget(DesktopWidget):
-    def __init__(self, master, x, y):
+    def __init__(self, master, x, y, feed=None):
+        self.feed = feed or get_word_feed()
         super().__init__(master, x, y, "Lexicon")
         self.load_word()
 
@@ -447,24 +3170,11 @@ class LexiconWidget(DesktopWidget):
         self.btn_next.bind("<Leave>", lambda e: self.btn_next.config(fg="#444"))
 
     def load_word(self):
-        threading.Thread(target=self.fetch, daemon=True).start()
-
-    def fetch(self):
-        if not requests: return
-        try:
-            r = requests.get("https://random-word-api.herokuapp.com/word", timeout=3)
-            word = r.json()[0]
-            r2 = requests.get(f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}", timeout=3)
-            defn = "No definition found."
-            if r2.status_code == 200:
-                try:
-                    full = r2.json()[0]['meanings'][0]['definitions'][0]['definition']
-                    defn = (full[:65] + '...') if len(full) > 65 else full
-                except: pass
-            self.after(0, lambda w=word, d=defn: self.update_ui(w, d))
-        except: pass
+        # Served from the prefetched queue; only waits when it has run dry
+        self.feed.take(self.update_ui)
 
     def update_ui(self, word, defn):
+        defn = (defn[:65] + '...') if len(defn) > 65 else defn
         try:
             self.lbl_word.config(text=word.lower())
             self.lbl_def.config(text=defn)
@@ -473,6 +3183,7 @@ class LexiconWidget(DesktopWidget):
 # --- WIDGET 7: CLOCK (NEW) ---
 class ClockWidget(DesktopWidget):
     def __init__(self, master, x, y):
+        self.after_id = None
         super().__init__(master, x, y, "Clock")
         self.update_clock()
 
@@ -482,23 +3193,33 @@ class ClockWidget(DesktopWidget):
         
         self.lbl_date = tk.Label(self, text="...", font=("Segoe UI", 10), fg="#aaa", bg=THEME['bg'])
         self.lbl_date.pack(pady=(0, 10))
+        self.time_text = Binding(self.lbl_time, "text")
+        self.date_text = Binding(self.lbl_date, "text")
 
     def update_clock(self):
         now = datetime.datetime.now()
-        t_str = now.strftime("%H:%M")
-        d_str = now.strftime("%a, %d %b")
-        try:
-            self.lbl_time.config(text=t_str)
-            self.lbl_date.config(text=d_str.upper())
-        except: pass
-        self.after(1000, self.update_clock)
+        self.time_text.set(now.strftime("%H:%M"))
+        self.date_text.set(now.strftime("%a, %d %b").upper())
+        # Only minutes are shown: wake just past the next minute boundary
+        delay = (60 - now.second) * 1000 - now.microsecond // 1000 + 20
+        self.after_id = self.after(delay, self.update_clock)
+
+    def on_state_change(self, state):
+        if self.after_id:
+            self.after_cancel(self.after_id)
+            self.after_id = None
+        if state != "hidden": self.update_clock()
 
 # --- WIDGET 8: SETTINGS (MINIMALIST BAR) ---
 class SettingsWidget(DesktopWidget):
-    def __init__(self, master, x, y, widgets_dict):
-        self.widgets = widgets_dict
+    def __init__(self, master, x, y, app):
+        self.app = app
+        self.widgets = app.widgets  # name -> widget, None until first shown
         super().__init__(master, x, y, "Settings")
-        self.all_hidden = False
+        # Eye toggle: names to bring back on "show all"
+        self.all_hidden = app.start_hidden
+        self.restore = list(app.start_restore)
+        self.update_toggle_icon_color()
 
     def config_window(self, x, y):
         # Override geometry to be a slim bar (Height 32)
@@ -552,6 +3273,7 @@ class SettingsWidget(DesktopWidget):
             if w and w.winfo_exists():
                 try: w.attributes('-alpha', alpha)
                 except: pass
+        self.app.schedule_layout_save()
 
     def toggle_all_visibility(self, event=None):
         if self.all_hidden:
@@ -561,6 +3283,7 @@ class SettingsWidget(DesktopWidget):
             self.hide_all()
             self.all_hidden = True
         self.update_toggle_icon_color()
+        self.app.schedule_layout_save()
 
     def update_toggle_icon_color(self):
         # Update icon and color based on state
@@ -569,45 +3292,338 @@ class SettingsWidget(DesktopWidget):
         else:
             self.btn_toggle.config(text="👁", fg="#aaa")
 
+    def is_shown(self, w):
+        try: return w is not None and bool(w.winfo_viewable())
+        except: return False
+
     def hide_all(self):
+        self.restore = [name for name, w in self.widgets.items() if self.is_shown(w)]
         for name, w in self.widgets.items():
             try: w.withdraw()
             except: pass
 
     def show_all(self):
-        for name, w in self.widgets.items():
-            try: w.deiconify()
+        for name in self.restore:
+            try: self.app.ensure_widget(name).deiconify()
             except: pass
 
     def show_manage_menu(self, event=None):
         menu = tk.Menu(self, tearoff=0, bg="#111", fg="#eee", font=THEME['font_small'], activebackground="#333")
         for name, w in self.widgets.items():
-            # Check state
-            is_visible = False
-            try: is_visible = bool(w.winfo_viewable())
-            except: pass
-            
-            label = f"✓ {name}" if is_visible else f"   {name}"
-            menu.add_command(label=label, command=lambda n=name, widget=w: self.toggle_single_widget(widget))
+            label = f"✓ {name}" if self.is_shown(w) else f"   {name}"
+            menu.add_command(label=label, command=lambda n=name: self.toggle_single_widget(n))
         
         try:
             menu.post(self.winfo_rootx(), self.winfo_rooty() + self.winfo_height())
         except: pass
 
-    def toggle_single_widget(self, w):
+    def toggle_single_widget(self, name):
+        # Widgets hidden at startup (or closed) are built here, on first reveal
+        w = self.widgets.get(name)
         try:
-            if w.winfo_viewable(): w.withdraw()
-            else: w.deiconify()
+            if self.is_shown(w): w.withdraw()
+            else: self.app.ensure_widget(name).deiconify()
         except: pass
+        self.app.schedule_layout_save()
 
 # --- WIDGET 9: WHITEBOARD ---
+def simplify_points(points, epsilon=0.75):
+    # Ramer-Douglas-Peucker on a flat [x0, y0, x1, y1, ...] list (iterative, no recursion limit)
+    n = len(points) // 2
+    if n < 3: return list(points)
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    eps2 = epsilon * epsilon
+    while stack:
+        a, b = stack.pop()
+        ax, ay, bx, by = points[2*a], points[2*a+1], points[2*b], points[2*b+1]
+        dx, dy = bx - ax, by - ay
+        seg2 = dx * dx + dy * dy
+        best, best_d = None, eps2
+        for i in range(a + 1, b):
+            px, py = points[2*i] - ax, points[2*i+1] - ay
+            if seg2:
+                cross = px * dy - py * dx
+                d = cross * cross / seg2
+            else:
+                d = px * px + py * py
+            if d > best_d: best, best_d = i, d
+        if best is not None:
+            keep[best] = True
+            stack.append((a, best))
+            stack.append((best, b))
+    return [c for i in range(n) if keep[i] for c in (points[2*i], points[2*i+1])]
+
+def spline_points(points, steps=12):
+    # The curve Tk draws for a smooth=True line (its default 12 splinesteps), as a flat
+    # polyline: one quadratic piece per inner point, joined at segment midpoints, through
+    # the end points of an open line. A line ending where it started is closed.
+    xy = list(zip(points[0::2], points[1::2]))
+    if len(xy) < 3: return list(points)
+    closed = xy[0] == xy[-1]
+    if closed: xy = [xy[-2]] + xy
+    out = []
+    for i in range(1, len(xy) - 1):
+        (px, py), (cx, cy), (nx, ny) = xy[i-1], xy[i], xy[i+1]
+        ax, ay = (px, py) if i == 1 and not closed else ((px + cx) / 2, (py + cy) / 2)
+        bx, by = (nx, ny) if i == len(xy) - 2 and not closed else ((cx + nx) / 2, (cy + ny) / 2)
+        if not out: out += [ax, ay]
+        for k in range(1, steps + 1):
+            t = k / steps
+            u = 1 - t
+            out += [u*u*ax + 2*u*t*cx + t*t*bx, u*u*ay + 2*u*t*cy + t*t*by]
+    return out
+
+class Stroke:
+    # One pen-down..pen-up gesture = one canvas line item
+    def __init__(self, color, width, points, item=None):
+        self.id = None  # Assigned by StrokeStore.add
+        self.color = color
+        self.width = width
+        self.points = points  # Flat [x0, y0, x1, y1, ...]
+        self.item = item
+
+def segment_dist2(px, py, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    seg2 = dx * dx + dy * dy
+    t = 0 if not seg2 else max(0, min(1, ((px - ax) * dx + (py - ay) * dy) / seg2))
+    cx, cy = ax + t * dx - px, ay + t * dy - py
+    return cx * cx + cy * cy
+
+class StrokeStore:
+    # Strokes by id plus a uniform grid (cell -> stroke ids) so hit tests only look
+    # at strokes passing near the point instead of every stroke on the board
+    def __init__(self, cell=32):
+        self.cell = cell
+        self.strokes = {}
+        self.grid = {}
+        self.next_id = 1
+
+    def __len__(self):
+        return len(self.strokes)
+
+    def __iter__(self):
+        return iter(list(self.strokes.values()))
+
+    def cells(self, stroke):
+        # Cells touched by each segment's bounding box (grown by half the line width)
+        c, pad, pts = self.cell, stroke.width / 2 + 1, stroke.points
+        out = set()
+        for i in range(0, len(pts) - 2, 2):
+            x0, x1 = sorted((pts[i], pts[i+2]))
+            y0, y1 = sorted((pts[i+1], pts[i+3]))
+            for cx in range(int((x0 - pad) // c), int((x1 + pad) // c) + 1):
+                for cy in range(int((y0 - pad) // c), int((y1 + pad) // c) + 1):
+                    out.add((cx, cy))
+        return out
+
+    def add(self, stroke):
+        stroke.id = self.next_id
+        self.next_id += 1
+        self.strokes[stroke.id] = stroke
+        for key in self.cells(stroke):
+            self.grid.setdefault(key, set()).add(stroke.id)
+        return stroke
+
+    def remove(self, stroke):
+        self.strokes.pop(stroke.id, None)
+        for key in self.cells(stroke):
+            ids = self.grid.get(key)
+            if ids:
+                ids.discard(stroke.id)
+                if not ids: del self.grid[key]
+
+    def clear(self):
+        self.strokes.clear()
+        self.grid.clear()
+
+    def query_rect(self, x0, y0, x1, y1):
+        # -> strokes registered in the cells overlapping the rectangle, in drawing order
+        c = self.cell
+        ids = set()
+        for cx in range(int(x0 // c), int(x1 // c) + 1):
+            for cy in range(int(y0 // c), int(y1 // c) + 1):
+                ids |= self.grid.get((cx, cy), set())
+        return [self.strokes[i] for i in sorted(ids)]
+
+    def hit(self, x, y, radius):
+        # -> strokes with a segment within `radius` (+ half their width) of (x, y)
+        c = self.cell
+        ids = set()
+        for cx in range(int((x - radius) // c), int((x + radius) // c) + 1):
+            for cy in range(int((y - radius) // c), int((y + radius) // c) + 1):
+                ids |= self.grid.get((cx, cy), set())
+        hits = []
+        for sid in ids:
+            stroke = self.strokes[sid]
+            r = radius + stroke.width / 2
+            pts = stroke.points
+            for i in range(0, len(pts) - 2, 2):
+                if segment_dist2(x, y, pts[i], pts[i+1], pts[i+2], pts[i+3]) <= r * r:
+                    hits.append(stroke)
+                    break
+        return hits
+
+# Whiteboard file: b"WBD1", varint stroke count, then per stroke: RGB (3 bytes),
+# width (1 byte), varint point count, zigzag-varint x/y deltas from the previous point
+def write_varint(out, v):
+    while v >= 0x80:
+        out.append((v & 0x7f) | 0x80)
+        v >>= 7
+    out.append(v)
+
+def read_varint(data, pos):
+    v = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        v |= (b & 0x7f) << shift
+        if b < 0x80: return v, pos
+        shift += 7
+
+def encode_strokes(strokes):
+    out = bytearray(b"WBD1")
+    write_varint(out, len(strokes))
+    for color, width, points in strokes:
+        out += bytes.fromhex(color.lstrip("#"))
+        out.append(min(int(width), 255))
+        write_varint(out, len(points) // 2)
+        px = py = 0
+        for i in range(0, len(points), 2):
+            x, y = int(round(points[i])), int(round(points[i+1]))
+            for d in (x - px, y - py):
+                write_varint(out, d << 1 if d >= 0 else (-d << 1) - 1)
+            px, py = x, y
+    return bytes(out)
+
+def decode_strokes(data):
+    # -> [(color, width, points), ...]
+    if data[:4] != b"WBD1": raise ValueError("Not a whiteboard file")
+    count, pos = read_varint(data, 4)
+    strokes = []
+    for _ in range(count):
+        color = "#" + data[pos:pos+3].hex()
+        width = data[pos+3]
+        n, pos = read_varint(data, pos + 4)
+        points, px, py = [], 0, 0
+        for _ in range(n):
+            zx, pos = read_varint(data, pos)
+            zy, pos = read_varint(data, pos)
+            px += (zx >> 1) ^ -(zx & 1)
+            py += (zy >> 1) ^ -(zy & 1)
+            points += [px, py]
+        strokes.append((color, width, points))
+    return strokes
+
+def encode_png(width, height, rgba):
+    # Minimal RGBA PNG (filter 0 rows, fast zlib) for Tk's built-in png photo format
+    stride = width * 4
+    raw = b"".join(b"\x00" + rgba[y * stride:(y + 1) * stride] for y in range(height))
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 1)) + chunk(b"IEND", b""))
+
+class RasterLayer:
+    # Finished strokes flattened into TILE x TILE RGBA tiles, each shown as one canvas
+    # image below the live vector items. Only tiles touched since the last flush are
+    # re-encoded, so redraw cost depends on the visible area, not on the drawing history.
+    # Unpainted pixels stay transparent (canvas bg / transparency key shows through).
+    TILE = 64
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.tiles = {}  # (tx, ty) -> bytearray RGBA
+        self.images = {}  # (tx, ty) -> (PhotoImage, canvas item)
+        self.dirty = set()
+        self.discs = {}
+
+    def disc(self, width):
+        # Pixel offsets covered by a round pen of this width
+        if width not in self.discs:
+            r = max(width / 2, 0.5)
+            ri = int(r + 0.5)
+            self.discs[width] = [(dx, dy) for dx in range(-ri, ri + 1) for dy in range(-ri, ri + 1)
+                                 if dx * dx + dy * dy <= r * r + 0.25]
+        return self.discs[width]
+
+    def draw_stroke(self, stroke, clip=None):
+        # Stamp the pen along the same curve the live (smooth) canvas item showed;
+        # `clip` limits drawing to those tile keys
+        T = self.TILE
+        rgba = bytes.fromhex(stroke.color.lstrip("#")) + b"\xff"
+        pts = spline_points(stroke.points)
+        centers = set()
+        for i in range(0, max(len(pts) - 2, 1), 2):
+            ax, ay = pts[i], pts[i+1]
+            bx, by = (pts[i+2], pts[i+3]) if i + 3 < len(pts) else (ax, ay)
+            steps = max(1, int(max(abs(bx - ax), abs(by - ay))))
+            for k in range(steps + 1):
+                centers.add((int(round(ax + (bx - ax) * k / steps)), int(round(ay + (by - ay) * k / steps))))
+        pixels = {(cx + dx, cy + dy) for cx, cy in centers for dx, dy in self.disc(stroke.width)}
+        for x, y in pixels:
+            if x < 0 or y < 0: continue
+            key = (x // T, y // T)
+            if clip is not None and key not in clip: continue
+            tile = self.tiles.get(key)
+            if tile is None:
+                tile = self.tiles[key] = bytearray(T * T * 4)
+            i = ((y % T) * T + x % T) * 4
+            tile[i:i+4] = rgba
+            self.dirty.add(key)
+
+    def rebuild(self, x0, y0, x1, y1, store):
+        # Re-render the tiles under a rectangle from the flattened strokes still in the store
+        T = self.TILE
+        keys = {(tx, ty) for tx in range(max(0, int(x0 // T)), int(x1 // T) + 1)
+                for ty in range(max(0, int(y0 // T)), int(y1 // T) + 1)}
+        for key in keys:
+            if key in self.tiles:
+                self.tiles[key] = bytearray(T * T * 4)
+                self.dirty.add(key)
+        for key in keys:
+            tx, ty = key
+            for stroke in store.query_rect(tx * T, ty * T, tx * T + T - 1, ty * T + T - 1):
+                if stroke.item is None: self.draw_stroke(stroke, clip={key})
+
+    def flush(self):
+        T = self.TILE
+        for key in self.dirty:
+            data = base64.b64encode(encode_png(T, T, bytes(self.tiles[key])))
+            if key in self.images:
+                self.images[key][0].configure(data=data, format="png")
+            else:
+                photo = tk.PhotoImage(master=self.canvas, data=data, format="png")
+                item = self.canvas.create_image(key[0] * T, key[1] * T, image=photo, anchor="nw")
+                self.canvas.tag_lower(item)
+                self.images[key] = (photo, item)
+        self.dirty.clear()
+
+    def clear(self):
+        for photo, item in self.images.values():
+            self.canvas.delete(item)
+        self.tiles.clear()
+        self.images.clear()
+        self.dirty.clear()
+
 class WhiteboardWidget(DesktopWidget):
+    persist_size = True
+
     def __init__(self, master, x, y):
-        self.draw_color = "white"
+        self.draw_color = "#ffffff"
         self.brush_size = 2
+        self.tool = "pen"  # pen | erase
+        self.eraser_radius = 6
         self.last_x, self.last_y = None, None
         self.is_transparent = False
+        self.store = StrokeStore()
+        self.current = None  # Stroke being drawn
+        self.save_after = None
+        self.flatten_after = None
+        self.file_path = os.path.join(DATA_DIR, "whiteboard.wbd")
         super().__init__(master, x, y, "Whiteboard")
+        self.load_board()
 
     def config_window(self, x, y):
         # Override to allow custom size and resizing
@@ -620,7 +3636,9 @@ class WhiteboardWidget(DesktopWidget):
     def setup_drag(self):
         # Initializes drag data but does NOT bind to self (window)
         # We only want to drag from the toolbar
-        self._drag_data = {"x": 0, "y": 0}
+        self.drag_session = None
+        self.drag_throttle = FrameThrottle(self.after, apply_positions)
+        self.resize_throttle = FrameThrottle(self.after, lambda size: self.geometry("%dx%d" % size))
 
     def setup_ui(self):
         # Toolbar (Top) - Handles dragging
@@ -631,12 +3649,14 @@ class WhiteboardWidget(DesktopWidget):
         # Bind Drag to Toolbar
         self.toolbar.bind("<Button-1>", self.on_drag_start)
         self.toolbar.bind("<B1-Motion>", self.on_drag_motion)
+        self.toolbar.bind("<ButtonRelease-1>", self.on_drag_end)
         
         # Title/Grip Area
         lbl_title = tk.Label(self.toolbar, text=":::", fg="#555", bg="#1a1a1a", cursor="fleur")
         lbl_title.pack(side="left", padx=5)
         lbl_title.bind("<Button-1>", self.on_drag_start)
         lbl_title.bind("<B1-Motion>", self.on_drag_motion)
+        lbl_title.bind("<ButtonRelease-1>", self.on_drag_end)
 
         # Colors
         colors = [("white", "#ffffff"), ("cyan", "#00e5ff"), ("green", "#00e676"), ("red", "#ff1744"), ("yellow", "#f1c40f")]
@@ -648,7 +3668,7 @@ class WhiteboardWidget(DesktopWidget):
         # Eraser
         btn_erase = tk.Label(self.toolbar, text="⌫", font=("Segoe UI", 10), fg="#aaa", bg="#1a1a1a", cursor="hand2")
         btn_erase.pack(side="left", padx=5)
-        btn_erase.bind("<Button-1>", lambda e: self.set_color(THEME['bg'], 12)) # Eraser uses BG color (will update if transp)
+        btn_erase.bind("<Button-1>", lambda e: self.set_eraser()) # Deletes whole strokes under the cursor
         
         # Transparency Toggle
         self.btn_transp = tk.Label(self.toolbar, text="▢", font=("Segoe UI", 12), fg="#aaa", bg="#1a1a1a", cursor="hand2")
@@ -665,6 +3685,7 @@ class WhiteboardWidget(DesktopWidget):
         # Canvas
         self.canvas = tk.Canvas(self, bg=THEME['bg'], highlightthickness=0, cursor="crosshair")
         self.canvas.pack(fill="both", expand=True)
+        self.raster = RasterLayer(self.canvas)
         
         self.canvas.bind("<Button-1>", self.start_draw)
         self.canvas.bind("<B1-Motion>", self.draw)
@@ -675,18 +3696,17 @@ class WhiteboardWidget(DesktopWidget):
         self.grip.place(relx=1.0, rely=1.0, anchor="se")
         self.grip.bind("<Button-1>", self.start_resize)
         self.grip.bind("<B1-Motion>", self.perform_resize)
+        self.grip.bind("<ButtonRelease-1>", lambda e: self.notify_layout())
 
     def set_color(self, col, size):
-        # If we are in transparent mode and erasing, we need the transparent color
-        current_bg = self.canvas.cget("bg")
-        if col == THEME['bg'] and self.is_transparent:
-           self.draw_color = "#010101" # The transparency key
-        elif col == THEME['bg']:
-            self.draw_color = current_bg # Regular eraser
-        else:
-            self.draw_color = col
-            
+        self.tool = "pen"
+        self.draw_color = col
         self.brush_size = size
+        self.canvas.config(cursor="crosshair")
+
+    def set_eraser(self):
+        self.tool = "erase"
+        self.canvas.config(cursor="circle")
 
     def toggle_transparency(self, event=None):
         self.is_transparent = not self.is_transparent
@@ -710,20 +3730,118 @@ class WhiteboardWidget(DesktopWidget):
 
     def clear_canvas(self, event=None):
         self.canvas.delete("all")
+        self.raster.clear()
+        self.store.clear()
+        self.schedule_save()
+
+    def add_stroke(self, color, width, points):
+        item = self.canvas.create_line(*points, width=width, fill=color,
+                                       capstyle="round", joinstyle="round", smooth=True)
+        return self.store.add(Stroke(color, width, points, item))
 
     def start_draw(self, event):
-        self.last_x, self.last_y = event.x, event.y
+        x, y = event.x, event.y
+        self.last_x, self.last_y = x, y
+        if self.tool == "erase":
+            self.erase_at(x, y)
+            return
+        item = self.canvas.create_line(x, y, x, y, width=self.brush_size, fill=self.draw_color,
+                                       capstyle="round", joinstyle="round", smooth=True)
+        self.current = Stroke(self.draw_color, self.brush_size, [x, y, x, y], item)
 
     def draw(self, event):
-        if self.last_x and self.last_y:
-            x, y = event.x, event.y
-            self.canvas.create_line(self.last_x, self.last_y, x, y, 
-                                    width=self.brush_size, fill=self.draw_color, 
-                                    capstyle="round", smooth=True)
-            self.last_x, self.last_y = x, y
+        if self.last_x is None: return
+        x, y = event.x, event.y
+        if abs(x - self.last_x) < 1 and abs(y - self.last_y) < 1: return
+        if self.tool == "erase":
+            # Sample the eraser path so fast drags don't skip strokes
+            steps = max(1, int(max(abs(x - self.last_x), abs(y - self.last_y)) // self.eraser_radius))
+            for i in range(1, steps + 1):
+                self.erase_at(self.last_x + (x - self.last_x) * i / steps, self.last_y + (y - self.last_y) * i / steps)
+        elif self.current is not None:
+            # Extend the stroke's single item in place (Tk appends coords, no new item)
+            self.current.points += [x, y]
+            self.canvas.insert(self.current.item, "end", (x, y))
+        self.last_x, self.last_y = x, y
 
     def stop_draw(self, event):
+        stroke, self.current = self.current, None
         self.last_x, self.last_y = None, None
+        if stroke is None: return
+        stroke.points = simplify_points(stroke.points)
+        self.canvas.coords(stroke.item, *stroke.points)
+        self.store.add(stroke)
+        self.schedule_save()
+        self.schedule_flatten()
+
+    def erase_at(self, x, y):
+        for stroke in self.store.hit(x, y, self.eraser_radius):
+            self.store.remove(stroke)
+            if stroke.item is not None:
+                self.canvas.delete(stroke.item)
+            else:
+                pts, pad = stroke.points, stroke.width
+                self.raster.rebuild(min(pts[0::2]) - pad, min(pts[1::2]) - pad,
+                                    max(pts[0::2]) + pad, max(pts[1::2]) + pad, self.store)
+                self.raster.flush()
+            self.schedule_save()
+
+    # Flattening: finished strokes move into the raster layer once drawing pauses
+    # (or right away when many are pending), so only recent strokes stay vector items
+    def schedule_flatten(self):
+        if self.flatten_after: self.after_cancel(self.flatten_after)
+        vector = sum(1 for s in self.store if s.item is not None)
+        self.flatten_after = self.after(1 if vector > 30 else 1500, self.flatten)
+
+    def flatten(self, batch=100):
+        self.flatten_after = None
+        if self.current is not None:  # Mid-gesture: try again later
+            self.schedule_flatten()
+            return
+        pending = [s for s in self.store if s.item is not None][:batch]
+        for stroke in pending:
+            self.raster.draw_stroke(stroke)
+            self.canvas.delete(stroke.item)
+            stroke.item = None
+        self.raster.flush()
+        if len(pending) == batch:  # Large board: keep the UI responsive between batches
+            self.flatten_after = self.after(1, self.flatten)
+
+    # Persistence: saved a couple of seconds after the last change, written on a worker
+    def load_board(self):
+        try:
+            with open(self.file_path, "rb") as f:
+                strokes = decode_strokes(f.read())
+        except (OSError, ValueError, IndexError):
+            return
+        for color, width, points in strokes:
+            if len(points) >= 4: self.add_stroke(color, width, points)
+        self.schedule_flatten()
+
+    def schedule_save(self):
+        if self.save_after: self.after_cancel(self.save_after)
+        self.save_after = self.after(2000, self.save_board)
+
+    def save_board(self):
+        self.save_after = None
+        snapshot = [(s.color, s.width, list(s.points)) for s in self.store]
+        get_scheduler().once(lambda: self.write_board(snapshot))
+
+    def write_board(self, snapshot):
+        data = encode_strokes(snapshot)
+        tmp = self.file_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.file_path)
+        except OSError:
+            pass
+
+    def on_destroy(self):
+        if self.save_after:
+            self.after_cancel(self.save_after)
+            self.write_board([(s.color, s.width, s.points) for s in self.store])
 
     # Resize Handling
     def start_resize(self, event):
@@ -739,7 +3857,35 @@ class WhiteboardWidget(DesktopWidget):
         new_w = max(100, self.start_w + delta_x)
         new_h = max(100, self.start_h + delta_y)
         
-        self.geometry(f"{new_w}x{new_h}")
+        self.resize_throttle.request((new_w, new_h))
+
+# --- LAYOUT ---
+class LayoutStore:
+    # DATA_DIR/layout.json: {"alpha": .., "all_hidden": .., "widgets": {name: {x, y, w, h, visible}}}
+    def __init__(self, path):
+        self.path = path
+        self.last = None  # Serialized form of the last write; unchanged layouts aren't rewritten
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def save(self, layout):
+        text = json.dumps(layout, indent=1, sort_keys=True)
+        if text == self.last: return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, self.path)
+            self.last = text
+        except OSError:
+            pass
 
 # --- MAIN APPLICATION MANAGER ---
 class CentralApp:
@@ -749,10 +3895,21 @@ class CentralApp:
         self.root.geometry("1x1+0+0")
         self.root.attributes('-alpha', 0.0)
         self.root.withdraw() 
+        get_scheduler().attach(self.root)
+        STARTUP.mark("tk_root")
         
+        self.screen_w = self.root.winfo_screenwidth()
         screen_h = self.root.winfo_screenheight()
+
+        # Saved layout (positions, visibility, opacity) from the last session
+        self.layout = LayoutStore(os.path.join(DATA_DIR, "layout.json"))
+        saved = self.layout.load()
+        try: THEME['alpha'] = min(1.0, max(0.1, float(saved.get("alpha", THEME['alpha']))))
+        except (TypeError, ValueError): pass
+        self.saved = saved.get("widgets") if isinstance(saved.get("widgets"), dict) else {}
+        self.screen_h = screen_h
         
-        # Layout Config 
+        # Default Layout Config (first run / widgets without a saved position)
         margin_x = 80
         margin_y = 80
         gap = 10
@@ -768,62 +3925,186 @@ class CentralApp:
             y = screen_h - margin_y - ((row_from_bottom + 1) * (w_height + gap))
             return x, y
 
-        # Col 0
-        x, y = get_pos(0, 0)
-        self.w1 = ArduinoWidget(self.root, x, y)
-        
-        x, y = get_pos(0, 1)
-        self.w2 = CryptoWidget(self.root, x, y, "bitcoin", "usd", "$", "BTC/USD")
-        
-        x, y = get_pos(0, 2)
-        self.w3 = CryptoWidget(self.root, x, y, "tether", "mxn", "$", "USDT/MXN")
-        
-        x, y = get_pos(0, 3)
-        self.w4 = MonitorWidget(self.root, x, y)
-        
-        # Col 1
-        x, y = get_pos(1, 0)
-        self.w5 = NotesWidget(self.root, x, y)
-        
-        x, y = get_pos(1, 1)
-        self.w6 = LauncherWidget(self.root, x, y)
-        
-        x, y = get_pos(1, 2)
-        self.w7 = LexiconWidget(self.root, x, y)
-        
-        x, y = get_pos(1, 3)
-        self.w8 = ClockWidget(self.root, x, y)
-        
         # Whiteboard (New) - Free placement
         # Place it to the right of column 1
         x_wb = margin_x + (2 * (w_width + gap))
         y_wb = screen_h - margin_y - (2 * (w_height + gap)) # Roughly middle height
-        self.w_whiteboard = WhiteboardWidget(self.root, x_wb, y_wb)
+
+        # name -> (factory, default x, default y). Widgets are built by ensure_widget:
+        # at startup if they were visible last session, otherwise on first reveal
+        root = self.root
+        self.factories = OrderedDict([
+            # Col 0
+            ("Arduino", (lambda x, y: ArduinoWidget(root, x, y),) + get_pos(0, 0)),
+            ("BTC", (lambda x, y: CryptoWidget(root, x, y, "bitcoin", "usd", "$", "BTC/USD"),) + get_pos(0, 1)),
+            ("USDT", (lambda x, y: CryptoWidget(root, x, y, "tether", "mxn", "$", "USDT/MXN"),) + get_pos(0, 2)),
+            ("Monitor", (lambda x, y: MonitorWidget(root, x, y),) + get_pos(0, 3)),
+            # Col 1
+            ("Notes", (lambda x, y: NotesWidget(root, x, y),) + get_pos(1, 0)),
+            ("Launcher", (lambda x, y: LauncherWidget(root, x, y),) + get_pos(1, 1)),
+            ("Lexicon", (lambda x, y: LexiconWidget(root, x, y),) + get_pos(1, 2)),
+            ("Clock", (lambda x, y: ClockWidget(root, x, y),) + get_pos(1, 3)),
+            ("Whiteboard", (lambda x, y: WhiteboardWidget(root, x, y), x_wb, y_wb)),
+        ])
+        self.widgets = OrderedDict((name, None) for name in self.factories)
+
+        # Hidden with the eye toggle: nothing is built, "show all" brings these back
+        self.start_hidden = bool(saved.get("all_hidden"))
+        self.start_restore = [name for name in self.factories if self.saved.get(name, {}).get("visible", True)]
+        if not self.start_hidden:
+            for name in self.start_restore:
+                self.ensure_widget(name)
 
         # Settings Widget: Placed above Col 0, but with custom gap since it's slimmer
         # Monitor is at get_pos(0, 3). Settings should be just above it.
         # get_pos returns top-left.
         mx, my = get_pos(0, 3) 
         settings_h = 32
-        sx = mx
-        sy = my - gap - settings_h
-        
-        all_widgets = {
-            "Arduino": self.w1,
-            "BTC": self.w2, 
-            "USDT": self.w3, 
-            "Monitor": self.w4,
-            "Notes": self.w5, 
-            "Launcher": self.w6, 
-            "Lexicon": self.w7, 
-            "Clock": self.w8,
-            "Whiteboard": self.w_whiteboard
-        }
-        self.w9 = SettingsWidget(self.root, sx, sy, all_widgets)
+        sx, sy = self.saved_pos("Settings", mx, my - gap - settings_h)
+        started = time.perf_counter()
+        self.settings = SettingsWidget(self.root, sx, sy, self)
+        STARTUP.record_widget("Settings", self.settings, started)
+        STARTUP.mark("widgets_built")
+
+        self.save_job = None
+        self.pending_layout = None
+        self.root.bind("<<LayoutChanged>>", self.schedule_layout_save)
+        self.root.bind("<Destroy>", self.on_root_destroy)
+        self.poll_idle()
+
+    def saved_pos(self, name, x, y):
+        # Saved position, kept on screen in case the resolution changed since
+        entry = self.saved.get(name)
+        if isinstance(entry, dict):
+            try: x, y = int(entry["x"]), int(entry["y"])
+            except (KeyError, TypeError, ValueError): pass
+        x = min(max(0, x), self.screen_w - 40)
+        y = min(max(0, y), self.screen_h - 30)
+        return x, y
+
+    def ensure_widget(self, name):
+        w = self.widgets.get(name)
+        try:
+            if w is not None and w.winfo_exists(): return w
+        except tk.TclError: pass
+        factory, x, y = self.factories[name]
+        x, y = self.saved_pos(name, x, y)
+        started = time.perf_counter()
+        w = factory(x, y)
+        STARTUP.record_widget(name, w, started)
+        entry = self.saved.get(name)
+        if w.persist_size and isinstance(entry, dict):
+            try: w.geometry("%dx%d" % (max(60, int(entry["w"])), max(40, int(entry["h"]))))
+            except (KeyError, TypeError, ValueError): pass
+        self.widgets[name] = w
+        return w
+
+    def layout_snapshot(self):
+        settings = self.settings
+        widgets = {}
+        for name, w in list(self.widgets.items()) + [("Settings", settings)]:
+            # Never-built / closed widgets keep their last known entry
+            entry = dict(self.saved.get(name, {}))
+            try:
+                if w is not None and w.winfo_exists():
+                    entry.update(x=w.winfo_x(), y=w.winfo_y(), w=w.winfo_width(), h=w.winfo_height(),
+                                 visible=w.lifecycle != "hidden")
+            except tk.TclError: pass
+            if name in self.widgets and settings.all_hidden:
+                entry["visible"] = name in settings.restore
+            if entry: widgets[name] = entry
+        self.saved = widgets
+        return {"alpha": round(THEME['alpha'], 2), "all_hidden": settings.all_hidden, "widgets": widgets}
+
+    def schedule_layout_save(self, event=None):
+        # Snapshot now (the widgets may be gone by the time the write happens, e.g. "Close All")
+        self.pending_layout = self.layout_snapshot()
+        if self.save_job is not None:
+            self.root.after_cancel(self.save_job)
+        self.save_job = self.root.after(LAYOUT_SAVE_DELAY_MS, self.save_layout)
+
+    def save_layout(self):
+        self.save_job = None
+        if self.pending_layout is not None:
+            self.layout.save(self.pending_layout)
+            self.pending_layout = None
+
+    def on_root_destroy(self, event):
+        if event.widget is self.root:
+            self.save_layout()
+            close_feed()
+
+    def poll_idle(self):
+        # `tk inactive` = ms since the last user input (-1 where unsupported).
+        # A locked screen gets no input either, so it ends up idle too.
+        try: idle_ms = int(self.root.tk.call('tk', 'inactive'))
+        except (tk.TclError, ValueError): idle_ms = -1
+        idle = idle_ms >= IDLE_AFTER_MS
+        if idle != DesktopWidget.user_idle:
+            DesktopWidget.user_idle = idle
+            for w in self.widgets.values():
+                try:
+                    if w is not None and w.winfo_exists() and w.lifecycle != "hidden":
+                        w.set_state("idle" if idle else "active")
+                except tk.TclError: pass
+        self.root.after(5000, self.poll_idle)
+
+    def trace_startup(self, out, settle_ms=3000, timeout_ms=15000):
+        # Wait for every startup widget to paint, give the deferred imports time to
+        # land, then write the report and quit
+        def check(waited=0):
+            if STARTUP.pending_paints() and waited < timeout_ms:
+                self.root.after(50, check, waited + 50)
+                return
+            STARTUP.mark("first_paint_all" if not STARTUP.pending_paints() else "paint_timeout")
+            self.root.after(settle_ms, finish)
+        def finish():
+            report = json.dumps(STARTUP.report(), indent=2)
+            if out == "-": print(report)
+            else:
+                with open(out, "w", encoding="utf-8") as f: f.write(report + "\n")
+            self.root.destroy()
+        self.root.after(0, check)
 
     def run(self):
         self.root.mainloop()
 
+STARTUP.mark("module_loaded")
+
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Desktop widgets")
+    parser.add_argument("--bench-drag", action="store_true", help="replay synthetic drag events and print geometry call counts")
+    parser.add_argument("--build-dictionary", metavar="SOURCE",
+                        help="build the offline Lexicon dictionary from a JSON {word: definition} or word<TAB>definition file")
+    parser.add_argument("--dictionary", default=LEXICON_DICTIONARY, metavar="FILE",
+                        help="dictionary file to write (default: %(default)s)")
+    parser.add_argument("--collector", choices=("thread", "process", "daemon"), default=COLLECTOR_MODE,
+                        help="run the data collectors in this process, in a child process, or use the shared --daemon (default: %(default)s)")
+    parser.add_argument("--daemon", action="store_true", help="run the data collectors headless and serve them on the local socket")
+    parser.add_argument("--watch", nargs="*", metavar="TOPIC",
+                        help="print the daemon's snapshot, or stream the given topics (e.g. monitor price:bitcoin:usd)")
+    parser.add_argument("--trace-startup", nargs="?", const="-", metavar="FILE",
+                        help="write startup timings (imports, per-widget build and first paint) as JSON and exit")
+    args = parser.parse_args()
+    if args.bench_drag:
+        print(json.dumps(bench_drag(), indent=2))
+        sys.exit(0)
+    if args.daemon:
+        try: daemon = WidgetDaemon()
+        except OSError as e: sys.exit(f"--daemon: {e}")
+        daemon.serve()
+        sys.exit(0)
+    if args.watch is not None:
+        try: watch_daemon(args.watch)
+        except OSError as e: sys.exit(f"--watch: daemon not reachable ({e})")
+        sys.exit(0)
+    if args.build_dictionary:
+        count = IndexedDictionary.build(read_dictionary_source(args.build_dictionary), args.dictionary)
+        print(f"{count} words -> {args.dictionary}")
+        sys.exit(0)
+    COLLECTOR_MODE = args.collector
+    STARTUP.enabled = args.trace_startup is not None
     app = CentralApp()
+    if STARTUP.enabled: app.trace_startup(args.trace_startup)
     app.run()
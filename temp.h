@@ -20,6 +20,11 @@ unsigned long ultimaActualizacion = 0;
 bool modoManual = false;
 bool estadoLuz = false; 
 
+// Modo stream: el PC pide "S:<ms>" y la placa envia tramas sola (0 = solo bajo pedido "D")
+unsigned long periodoStream = 0;
+unsigned long ultimoEnvio = 0;
+byte secuencia = 0;
+
 // Horario
 const int HORA_ENCENDIDO = 6;
 const int HORA_APAGADO = 20;
@@ -63,11 +68,35 @@ void enviarDatos() {
   Serial.println(modoManual);
 }
 
+// Trama: $seq,temp,hum,luz,HH:MM,manual*CS
+// CS = XOR de los bytes entre '$' y '*' en hexadecimal; seq permite contar tramas perdidas
+void enviarTrama() {
+  float h = dht.readHumidity();
+  float t = dht.readTemperature();
+  if (isnan(h) || isnan(t)) { h = 0; t = 0; }
+
+  char temp[8];
+  dtostrf(t, 1, 1, temp); // 1 decimal
+  char cuerpo[48];
+  snprintf(cuerpo, sizeof(cuerpo), "%u,%s,%d,%d,%02d:%02d,%d",
+           secuencia++, temp, (int)(h + 0.5), estadoLuz, horaActual, minutoActual, modoManual);
+
+  byte cs = 0;
+  for (char *p = cuerpo; *p; p++) cs ^= *p;
+
+  Serial.print('$');
+  Serial.print(cuerpo);
+  Serial.print('*');
+  if (cs < 0x10) Serial.print('0');
+  Serial.println(cs, HEX);
+}
+
 void loop() {
   // 1. ESCUCHAR PC
   if (Serial.available() > 0) {
     String comando = Serial.readStringUntil('\n');
     comando.trim();
+    bool confirmar = true; // Los comandos reconocidos (salvo "D") se confirman con "ACK:<comando>"
 
     if (comando == "ON") {
       modoManual = true;
@@ -92,12 +121,31 @@ void loop() {
         ultimaActualizacion = millis();
       }
     }
+    else if (comando.startsWith("S")) {
+      periodoStream = comando.substring(2).toInt();
+      ultimoEnvio = 0;
+    }
     else if (comando.startsWith("D")) {
       enviarDatos();
+      confirmar = false;
     }
+    else {
+      confirmar = false;
+    }
+
+    if (confirmar) {
+      Serial.print("ACK:");
+      Serial.println(comando);
+    }
+  }
+
+  // 2. STREAM
+  if (periodoStream > 0 && millis() - ultimoEnvio >= periodoStream) {
+    ultimoEnvio = millis();
+    enviarTrama();
   }
 
-  // 2. RELOJ INTERNO
+  // 3. RELOJ INTERNO
   if (millis() - ultimaActualizacion >= 60000) { 
     minutoActual++;
     if (minutoActual >= 60) {
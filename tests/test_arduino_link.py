@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("serial")
+tty = pytest.importorskip("tty")
+
+import centralized_widgets as cw
+from centralized_widgets import ArduinoLink
+
+
+class FakeBoard:
+    # pty stand-in for the firmware: answers "D" with a legacy reading once booted
+    def __init__(self, boot_s=0.0):
+        self.master, slave = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(slave)
+        self.path = os.ttyname(slave)
+        self.ready_at = time.time() + boot_s
+        self.alive = True
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        buf = b""
+        while self.alive:
+            try: buf += os.read(self.master, 100)
+            except OSError: return
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                if line.strip() == b"D" and time.time() >= self.ready_at:
+                    os.write(self.master, b"22.0,41,0,10:00,1\r\n")
+
+    def close(self):
+        self.alive = False
+        os.close(self.master)
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cw, "DATA_DIR", str(tmp_path))  # No remembered port
+
+
+def poll_until_connected(link, timeout):
+    deadline = time.time() + timeout
+    while link.conn is None and time.time() < deadline:
+        link.poll()
+        time.sleep(0.05)
+    return link.conn is not None
+
+
+def test_slow_board_found_without_replug():
+    # Misses the first sweep (boots slower than the probe), no port remembered yet
+    board = FakeBoard(boot_s=4)
+    link = ArduinoLink(candidates=lambda: [board.path])
+    try:
+        assert poll_until_connected(link, 15)
+        assert link.port == board.path
+    finally:
+        link.stop()
+        board.close()
+
+
+def test_remembered_port_retried_without_sweep(monkeypatch):
+    probed = []
+    link = ArduinoLink(candidates=lambda: ["/dev/a", "/dev/b"])
+    link.port = "/dev/b"
+    monkeypatch.setattr(link, "discover", lambda ports: (probed.append(list(ports)), (None, None))[1])
+    link.open()
+    link.open()
+    link.open()
+    assert probed == [["/dev/b", "/dev/a"], ["/dev/b"], ["/dev/b"]]
+    link.swept_at -= cw.ARDUINO_RESWEEP_S
+    link.open()
+    assert probed[-1] == ["/dev/b", "/dev/a"]
@@ -0,0 +1,97 @@
+import os
+import sys
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from centralized_widgets import NoteStore
+
+
+def write(path, data):
+    with open(path, "wb") as f: f.write(data)
+
+
+def read(path):
+    with open(path, "rb") as f: return f.read()
+
+
+def save(store, text):
+    store.submit(text)
+    store.flush()
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "notes.txt")
+    write(path, b"hello\n")
+    store = NoteStore(path)
+    assert store.load() == "hello\n"
+    save(store, "hello world\n")
+    save(store, "hello world\nsecond line\n")
+    assert read(path) == b"hello\n"  # Edits live in the journal until a compaction
+    assert NoteStore(path).load() == "hello world\nsecond line\n"
+
+
+def test_missing_file(tmp_path):
+    path = str(tmp_path / "notes.txt")
+    store = NoteStore(path)
+    assert store.load() == ""
+    save(store, "first")
+    assert NoteStore(path).load() == "first"
+
+
+def test_torn_record_is_ignored(tmp_path):
+    path = str(tmp_path / "notes.txt")
+    write(path, b"abc")
+    store = NoteStore(path)
+    store.load()
+    save(store, "abcd")
+    with open(store.journal_path, "ab") as f:
+        f.write(NoteStore.RECORD.pack(0, 0, 100) + b"partial")
+    assert NoteStore(path).load() == "abcd"
+
+
+def test_stale_journal_is_rewritten(tmp_path):
+    path = str(tmp_path / "notes.txt")
+    write(path, b"one\n")
+    store = NoteStore(path)
+    store.load()
+    save(store, "one edited\n")
+
+    write(path, b"two\n")  # Base replaced behind our back: the journal is stale
+    store = NoteStore(path)
+    assert store.load() == "two\n"
+    magic, crc = NoteStore.JOURNAL_HEADER.unpack_from(read(store.journal_path))
+    assert (magic, crc) == (NoteStore.MAGIC, zlib.crc32(b"two\n"))
+
+    save(store, "two edited\n")
+    assert NoteStore(path).load() == "two edited\n"
+
+
+def test_foreign_journal_is_rewritten(tmp_path):
+    path = str(tmp_path / "notes.txt")
+    write(path, b"text")
+    write(path + ".journal", b"not a journal at all")
+    store = NoteStore(path)
+    assert store.load() == "text"
+    save(store, "text!")
+    assert NoteStore(path).load() == "text!"
+
+
+def test_non_utf8_file_loads(tmp_path):
+    path = str(tmp_path / "notes.txt")
+    write(path, b"caf\xe9\r\nline\n")
+    store = NoteStore(path)
+    assert store.load() == "caf�\nline\n"
+    save(store, "caf�\nline\nmore\n")
+    assert NoteStore(path).load() == "caf�\nline\nmore\n"
+
+
+def test_compact(tmp_path):
+    path = str(tmp_path / "notes.txt")
+    store = NoteStore(path)
+    store.load()
+    save(store, "a\nb\n")
+    store.compact()
+    assert read(path) == "a\nb\n".replace("\n", os.linesep).encode("utf-8")
+    assert len(read(store.journal_path)) == NoteStore.JOURNAL_HEADER.size
+    assert NoteStore(path).load() == "a\nb\n"